@@ -0,0 +1,191 @@
+"""A compact event engine for the grocery store simulation.
+
+The usual engine performs Event objects: each do() call builds a fresh list
+of new Event objects, and the event queue orders them by comparing their
+timestamps. This engine instead compiles each event into a plain tuple
+
+    (timestamp, kind, a, b)
+
+where kind picks the handler and a and b are its arguments, e.g.
+(60, _ARRIVE, 'Bob', 5). A Rejoin's a is (customer_ids, base), where base
+is the sequence number reserved for the first Rejoin of its chain (see
+event.Rejoin), or None if none has been. The event queue is a heapq list of
+
+    (timestamp, seq, kind, a, b)
+
+tuples, where seq numbers the records in the order they were pushed. No
+two records have the same seq, so heapq compares them by (timestamp, seq)
+without ever looking at the rest. Handlers are looked up in a table by
+kind, and push the records they spawn straight onto the heap.
+
+The Event classes stay the way to describe events: compile_event turns one
+into a record, and events of any other Event subclass are compiled into a
+record which calls their do() method. The simulation performs exactly the
+same steps in the same order as with Event objects, so the stats are the
+same.
+
+This is used by GroceryStoreSimulation when the 'engine' configuration
+setting is 'compact'.
+"""
+from heapq import heappush, heappop
+from itertools import count
+
+from event import NewArrive, CloseLine, Rejoin, Begin, Finish, \
+    _ARRIVE, _CLOSE
+
+# The other kinds of record. _ARRIVE and _CLOSE are shared with the binary
+# event file format.
+_BEGIN = 2
+_FINISH = 3
+_REJOIN = 4
+# An event of another class: a is the Event itself.
+_OTHER = 5
+
+
+def compile_event(event):
+    """Return the record for <event>.
+
+    @type event: Event
+    @rtype: (int, int, object, object)
+
+    >>> compile_event(NewArrive(60, 'Bob', 5))
+    (60, 0, 'Bob', 5)
+    >>> compile_event(CloseLine(70, 2))
+    (70, 1, 2, None)
+    >>> compile_event(Rejoin(72, [4, 2], 1, 9))
+    (72, 4, ([4, 2], 8), 1)
+    """
+    kind = type(event)
+    if kind is NewArrive:
+        return event.timestamp, _ARRIVE, event.name, event.items
+    elif kind is CloseLine:
+        return event.timestamp, _CLOSE, event.which_line, None
+    elif kind is Begin:
+        return event.timestamp, _BEGIN, event.customer_id, None
+    elif kind is Finish:
+        return event.timestamp, _FINISH, event.customer_id, None
+    elif kind is Rejoin:
+        base = None
+        if event.sequence is not None:
+            base = event.sequence - event.position
+        return event.timestamp, _REJOIN, (event.customer_ids, base), \
+            event.position
+    return event.timestamp, _OTHER, event, None
+
+
+def perform(store, records):
+    """Perform the events of <records> on <store>, and every event they
+    spawn, and return the timestamp of the last event performed (0 if
+    none were).
+
+    On a timestamp tie, events from <records> come before spawned events,
+    just as if every event had been added to the event queue before the
+    simulation started.
+
+    @type store: GroceryStore
+    @type records: iterable[(int, int, object, object)]
+        Records from compile_event, in non-decreasing timestamp order.
+    @rtype: int
+
+    >>> from store import GroceryStore
+    >>> store = GroceryStore('config.json')
+    >>> perform(store, [compile_event(NewArrive(0, 'Jack', 3)),
+    ...                 compile_event(NewArrive(5, 'Jill', 1))])
+    10
+    >>> store.statistics.num_customers, store.statistics.max_wait
+    (2, 10)
+    >>> perform(store, [(2, _ARRIVE, 'Fred', 1), (1, _ARRIVE, 'Ann', 1)])
+    Traceback (most recent call last):
+    ...
+    ValueError: Event file is not in timestamp order at time 1
+    """
+    queue = []
+    next_seq = count().__next__
+    lines = store.check_out_lines.lines
+
+    def reserve(number):
+        # Return the first of <number> consecutive sequence numbers.
+        first = next_seq()
+        for _ in range(number - 1):
+            next_seq()
+        return first
+
+    # Each handler takes a record's timestamp, a and b.
+    def arrive(timestamp, name, items):
+        line = lines[store.new_join(timestamp, name, items)]
+        if len(line.customers) == 1:
+            heappush(queue, (timestamp, next_seq(), _BEGIN,
+                             line.customers[0], None))
+
+    def close(timestamp, which_line, _):
+        displaced = store.close_line(timestamp, which_line)
+        if len(displaced) > 0:
+            base = reserve(len(displaced))
+            heappush(queue, (timestamp + 1, base, _REJOIN,
+                             ([customer.customer_id for customer in displaced],
+                              base), 0))
+
+    def begin(timestamp, customer_id, _):
+        check_out_time = store.begin_check_out(timestamp, customer_id)
+        heappush(queue, (timestamp + check_out_time, next_seq(), _FINISH,
+                         customer_id, None))
+
+    def finish(timestamp, customer_id, _):
+        next_customer = store.finish_check_out(timestamp, customer_id)
+        if next_customer is not None:
+            heappush(queue, (timestamp, next_seq(), _BEGIN,
+                             next_customer.customer_id, None))
+
+    def rejoin(timestamp, chain, position):
+        customer_ids, base = chain
+        customer_id = customer_ids[position]
+        line = lines[store.rejoin(timestamp, customer_id)]
+        if len(line.customers) == 1:
+            heappush(queue, (timestamp, next_seq(), _BEGIN, customer_id,
+                             None))
+        if position + 1 < len(customer_ids):
+            if base is None:
+                # Not from the queue: reserve the rest of the chain now.
+                base = reserve(len(customer_ids) - position - 1) - \
+                    position - 1
+                chain = (customer_ids, base)
+            heappush(queue, (timestamp + 1, base + position + 1, _REJOIN,
+                             chain, position + 1))
+
+    def other(timestamp, event, _):
+        for spawned in event.do(store) or ():
+            timestamp, kind, a, b = compile_event(spawned)
+            if kind != _REJOIN:
+                sequence = next_seq()
+            elif a[1] is None:
+                sequence = reserve(len(a[0]) - b)
+                a = (a[0], sequence - b)
+            else:
+                sequence = a[1] + b
+            heappush(queue, (timestamp, sequence, kind, a, b))
+
+    # Indexed by kind.
+    handlers = [arrive, close, begin, finish, rejoin, other]
+
+    records = iter(records)
+    pending = next(records, None)
+    timestamp = 0
+    while True:
+        if pending is not None and (not queue or
+                                    pending[0] <= queue[0][0]):
+            timestamp, kind, a, b = pending
+            pending = next(records, None)
+            if pending is not None and pending[0] < timestamp:
+                raise ValueError('Event file is not in timestamp order at '
+                                 'time {}'.format(pending[0]))
+        elif queue:
+            timestamp, _, kind, a, b = heappop(queue)
+        else:
+            return timestamp
+        handlers[kind](timestamp, a, b)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
@@ -6,6 +6,9 @@ and Priority Queue data types.
 You are responsible for completing the 'add' method of
 PriorityQueue.
 """
+from collections import deque
+from heapq import heappush, heappop
+from operator import attrgetter
 
 
 class Container:
@@ -14,15 +17,29 @@ class Container:
     This is an abstract class. Only child classes should be instantiated.
     """
 
-    def add(self, item):
+    def add(self, item, sequence=None):
         """Add <item> to this Container.
 
         @type self: Container
         @type item: object
+        @type sequence: int | None
+            Where <item> goes among items tied with it: a number returned by
+            reserve, to order it as if it had been added when that number
+            was reserved. By default, after every item added so far.
         @rtype: None
         """
         raise NotImplementedError
 
+    def reserve(self, count):
+        """Reserve <count> consecutive sequence numbers for items which are
+        to be added later, and return the first of them.
+
+        @type self: Container
+        @type count: int
+        @rtype: int
+        """
+        raise NotImplementedError
+
     def remove(self):
         """Remove and return a single item from this Container.
 
@@ -39,6 +56,28 @@ class Container:
         """
         raise NotImplementedError
 
+    def peek(self):
+        """Return the item that remove() would return, without removing it.
+
+        Precondition: <self> should not be empty.
+
+        @type self: Container
+        @rtype: object
+        """
+        raise NotImplementedError
+
+    def remove_batch(self):
+        """Remove and return the next item and all items tied with it.
+
+        The items are returned in the order remove() would return them.
+
+        Precondition: <self> should not be empty.
+
+        @type self: Container
+        @rtype: list[object]
+        """
+        raise NotImplementedError
+
 
 class PriorityQueue(Container):
     """A queue of items that operates in priority order.
@@ -49,7 +88,9 @@ class PriorityQueue(Container):
     removed.
 
     Priority is defined by the rich comparison methods for the objects in the
-    container (__lt__, __le__, __gt__, __ge__).
+    container (__lt__, __le__, __gt__, __ge__). Alternatively, a <key>
+    function may be given, in which case items are compared by key(item)
+    instead; key(x) < key(y) must mean the same thing as x < y.
 
     If x < y, then x has a *HIGHER* priority than y. (Intuitively, "priority 1"
     is more important than "priority 10".)
@@ -57,20 +98,38 @@ class PriorityQueue(Container):
     All objects in the container must be of the same type.
     """
     # === Private Attributes ===
-    # @type _items: list
-    #     The items stored in the priority queue.
+    # @type _items: list[(object, int, object)]
+    #     The entries stored in the priority queue. Each entry is
+    #     (priority, sequence number, item), where the priority is key(item)
+    #     when a key function was given and the item itself otherwise.
+    # @type _counter: int
+    #     The sequence number of the next item added or reserved, used to
+    #     break ties between items of equal priority. A plain int rather
+    #     than an itertools.count, so that the queue can be pickled.
+    # @type _key: callable | None
+    #     The key function items are compared by, if any.
     #
     # === Representation Invariants ===
-    # _items is a sorted list, where the front item is the one with the
-    # highest priority.
+    # _items is a binary min-heap (see the heapq module) of entries, so the
+    # front entry holds the item with the highest priority, and among equal
+    # items the one inserted first. Sequence numbers are unique, so two
+    # entries never tie.
 
-    def __init__(self):
+    def __init__(self, key=None):
         """Initialize an empty PriorityQueue.
 
+        Comparing small keys (such as ints) is much cheaper than calling
+        the items' own comparison methods, so <key> is worth passing for
+        large queues.
+
         @type self: PriorityQueue
+        @type key: callable | None
+            A function returning the value to compare each item by.
         @rtype: None
         """
         self._items = []
+        self._counter = 0
+        self._key = key
 
     def remove(self):
         """Remove and return the next item from this PriorityQueue.
@@ -94,7 +153,7 @@ class PriorityQueue(Container):
         >>> pq.remove()
         'mona'
         """
-        return self._items.pop(0)
+        return heappop(self._items)[-1]
 
     def is_empty(self):
         """
@@ -112,11 +171,60 @@ class PriorityQueue(Container):
         """
         return len(self._items) == 0
 
-    def add(self, item):
+    def peek(self):
+        """Return the next item in this PriorityQueue without removing it.
+
+        Precondition: <self> should not be empty.
+
+        @type self: PriorityQueue
+        @rtype: object
+
+        >>> pq = PriorityQueue()
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.peek()
+        'arju'
+        >>> pq.remove()
+        'arju'
+        """
+        return self._items[0][-1]
+
+    def remove_batch(self):
+        """Remove and return the next items of equal priority, in order.
+
+        Precondition: <self> should not be empty.
+
+        @type self: PriorityQueue
+        @rtype: list[object]
+
+        >>> pq = PriorityQueue(key=len)
+        >>> pq.add('fred')
+        >>> pq.add('hat')
+        >>> pq.add('arju')
+        >>> pq.remove_batch()
+        ['hat']
+        >>> pq.remove_batch()
+        ['fred', 'arju']
+        >>> pq.is_empty()
+        True
+        """
+        items = self._items
+        priority = items[0][0]
+        batch = [heappop(items)[-1]]
+        # Nothing in the heap has a higher priority, so anything which
+        # is not lower is equal.
+        while items and not priority < items[0][0]:
+            batch.append(heappop(items)[-1])
+        return batch
+
+    def add(self, item, sequence=None):
         """Add <item> to this PriorityQueue.
 
+        Runs in O(log n) time, where n is the number of items in the queue.
+
         @type self: PriorityQueue
         @type item: object
+        @type sequence: int | None
         @rtype: None
 
         >>> pq = PriorityQueue()
@@ -124,20 +232,264 @@ class PriorityQueue(Container):
         >>> pq.add('arju')
         >>> pq.add('mona')
         >>> pq.add('hat')
-        >>> pq._items
+        >>> [pq.remove() for _ in range(4)]
         ['arju', 'fred', 'hat', 'mona']
+        >>> from event import Event
+        >>> first, urgent, second = Event(5), Event(3), Event(5)
+        >>> pq.add(first)
+        >>> pq.add(urgent)
+        >>> pq.add(second)
+        >>> pq.remove() is urgent
+        True
+        >>> pq.remove() is first
+        True
+        >>> pq.remove() is second
+        True
+        >>> pq = PriorityQueue(key=len)
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.add('hat')
+        >>> [pq.remove() for _ in range(3)]
+        ['hat', 'fred', 'arju']
         """
-        # TODO: Implement this method.
-        if self.is_empty() or item.__gt__(self._items[len(self._items) - 1]):
-            self._items.append(item)
+        if sequence is None:
+            sequence = self._counter
+            self._counter += 1
+        if self._key is None:
+            heappush(self._items, (item, sequence, item))
         else:
-            for x in range(len(self._items)):
-                if item.__lt__(self._items[x]):
-                    self._items.insert(x, item)
-                    break
-                elif item.__eq__(self._items[x]):
-                    self._items.insert(x + 1, item)
-                    break
+            heappush(self._items, (self._key(item), sequence, item))
+
+    def reserve(self, count):
+        """Reserve <count> consecutive sequence numbers for items which are
+        to be added later, and return the first of them.
+
+        @type self: PriorityQueue
+        @type count: int
+        @rtype: int
+
+        >>> pq = PriorityQueue(key=len)
+        >>> later = pq.reserve(1)
+        >>> pq.add('fred')
+        >>> pq.add('arju', later)
+        >>> [pq.remove() for _ in range(2)]
+        ['arju', 'fred']
+        """
+        first = self._counter
+        self._counter += count
+        return first
+
+
+class CalendarQueue(Container):
+    """A priority queue for items with non-negative integer priorities.
+
+    Items are removed in the same order as from a PriorityQueue: lowest
+    priority value first, with ties resolved in FIFO order. Rather than a
+    heap, items are kept in one FIFO bucket per priority value, and the
+    queue walks forward through the buckets as they empty.
+
+    When the priorities in the queue are dense (most values between the
+    smallest and largest have a bucket, as with simulation timestamps that
+    are only a few seconds apart), add and remove take amortized O(1) time.
+    Sparse priorities are still handled correctly; each remove costs at
+    most O(b), where b is the number of non-empty buckets.
+    """
+    # === Private Attributes ===
+    # @type _buckets: dict[int, deque[(int, object)]]
+    #     Maps each priority value to the (sequence number, item) entries
+    #     with that priority, in sequence number order.
+    # @type _counter: int
+    #     The sequence number of the next item added or reserved.
+    # @type _current: int | None
+    #     The smallest priority value in the queue, or None if it is empty.
+    # @type _size: int
+    #     The number of items in the queue.
+    # @type _key: callable
+    #     The function giving the priority of an item.
+    #
+    # === Representation Invariants ===
+    # No bucket in _buckets is empty.
+    # _current is None iff _buckets is empty; otherwise it is
+    # min(_buckets).
+    # _size is the total length of all buckets.
+
+    def __init__(self, key=attrgetter('timestamp')):
+        """Initialize an empty CalendarQueue.
+
+        @type self: CalendarQueue
+        @type key: callable
+            A function returning the priority of an item, which must be a
+            non-negative int. By default, the item's timestamp is used.
+        @rtype: None
+        """
+        self._buckets = {}
+        self._current = None
+        self._size = 0
+        self._counter = 0
+        self._key = key
+
+    def add(self, item, sequence=None):
+        """Add <item> to this CalendarQueue.
+
+        @type self: CalendarQueue
+        @type item: object
+        @type sequence: int | None
+        @rtype: None
+
+        >>> from event import Event
+        >>> cq = CalendarQueue()
+        >>> first, urgent, second = Event(5), Event(3), Event(5)
+        >>> cq.add(first)
+        >>> cq.add(urgent)
+        >>> cq.add(second)
+        >>> cq.remove() is urgent
+        True
+        >>> cq.remove() is first
+        True
+        >>> cq.remove() is second
+        True
+        >>> later = cq.reserve(1)
+        >>> cq.add(first)
+        >>> cq.add(second, later)
+        >>> cq.remove() is second
+        True
+        """
+        if sequence is None:
+            sequence = self._counter
+            self._counter += 1
+        priority = self._key(item)
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            bucket = deque()
+            self._buckets[priority] = bucket
+            if self._current is None or priority < self._current:
+                self._current = priority
+        if bucket and bucket[-1][0] > sequence:
+            # Added late with a reserved number: find its place, which is
+            # usually near the end.
+            index = len(bucket)
+            while index > 0 and bucket[index - 1][0] > sequence:
+                index -= 1
+            bucket.insert(index, (sequence, item))
+        else:
+            bucket.append((sequence, item))
+        self._size += 1
+
+    def reserve(self, count):
+        """Reserve <count> consecutive sequence numbers for items which are
+        to be added later, and return the first of them.
+
+        @type self: CalendarQueue
+        @type count: int
+        @rtype: int
+        """
+        first = self._counter
+        self._counter += count
+        return first
+
+    def remove(self):
+        """Remove and return the next item from this CalendarQueue.
+
+        Precondition: <self> should not be empty.
+
+        @type self: CalendarQueue
+        @rtype: object
+
+        >>> cq = CalendarQueue(key=len)
+        >>> cq.add('fred')
+        >>> cq.add('hat')
+        >>> cq.add('arju')
+        >>> [cq.remove() for _ in range(3)]
+        ['hat', 'fred', 'arju']
+        """
+        bucket = self._buckets[self._current]
+        item = bucket.popleft()[1]
+        self._size -= 1
+        if not bucket:
+            del self._buckets[self._current]
+            self._advance()
+        return item
+
+    def is_empty(self):
+        """Return True iff this CalendarQueue is empty.
+
+        @type self: CalendarQueue
+        @rtype: bool
+
+        >>> cq = CalendarQueue(key=len)
+        >>> cq.is_empty()
+        True
+        >>> cq.add('fred')
+        >>> cq.is_empty()
+        False
+        """
+        return self._size == 0
+
+    def peek(self):
+        """Return the next item in this CalendarQueue without removing it.
+
+        Precondition: <self> should not be empty.
+
+        @type self: CalendarQueue
+        @rtype: object
+
+        >>> cq = CalendarQueue(key=len)
+        >>> cq.add('fred')
+        >>> cq.add('hat')
+        >>> cq.peek()
+        'hat'
+        >>> cq.remove()
+        'hat'
+        """
+        return self._buckets[self._current][0][1]
+
+    def remove_batch(self):
+        """Remove and return the next items of equal priority, in order.
+
+        This takes the whole next bucket at once.
+
+        Precondition: <self> should not be empty.
+
+        @type self: CalendarQueue
+        @rtype: list[object]
+
+        >>> cq = CalendarQueue(key=len)
+        >>> cq.add('fred')
+        >>> cq.add('hat')
+        >>> cq.add('arju')
+        >>> cq.remove_batch()
+        ['hat']
+        >>> cq.remove_batch()
+        ['fred', 'arju']
+        >>> cq.is_empty()
+        True
+        """
+        batch = [item for _, item in self._buckets.pop(self._current)]
+        self._size -= len(batch)
+        self._advance()
+        return batch
+
+    def _advance(self):
+        """Move _current to the smallest priority left in the queue.
+
+        Steps forward one priority value at a time, which is cheap when
+        priorities are dense. Once the walk has taken as many steps as
+        there are buckets, give up and take the minimum directly instead.
+
+        @type self: CalendarQueue
+        @rtype: None
+        """
+        if not self._buckets:
+            self._current = None
+            return
+        buckets = self._buckets
+        priority = self._current + 1
+        for _ in range(len(buckets)):
+            if priority in buckets:
+                self._current = priority
+                return
+            priority += 1
+        self._current = min(buckets)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+"""Benchmark for the containers used to schedule simulation events.
+
+Times PriorityQueue and CalendarQueue against the original sorted-list
+implementation, then runs a full GroceryStoreSimulation on a large generated
+event file.
+
+Usage: python container_benchmark.py [num_events]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from operator import attrgetter
+
+from container import Container, PriorityQueue, CalendarQueue
+from event import NewArrive, create_event_list
+from simulation import GroceryStoreSimulation
+from workload import write_event_file
+
+
+class _SortedListQueue(Container):
+    """The original PriorityQueue, kept here only as a baseline.
+
+    add() does a linear scan plus list.insert, and remove() does
+    list.pop(0), so both are O(n).
+    """
+
+    def __init__(self):
+        """Initialize an empty _SortedListQueue.
+
+        @type self: _SortedListQueue
+        @rtype: None
+        """
+        self._items = []
+
+    def add(self, item):
+        """Add <item> to this _SortedListQueue.
+
+        @type self: _SortedListQueue
+        @type item: object
+        @rtype: None
+        """
+        if self.is_empty() or item.__gt__(self._items[len(self._items) - 1]):
+            self._items.append(item)
+        else:
+            for x in range(len(self._items)):
+                if item.__lt__(self._items[x]):
+                    self._items.insert(x, item)
+                    break
+                elif item.__eq__(self._items[x]):
+                    self._items.insert(x + 1, item)
+                    break
+
+    def remove(self):
+        """Remove and return the next item from this _SortedListQueue.
+
+        @type self: _SortedListQueue
+        @rtype: object
+        """
+        return self._items.pop(0)
+
+    def is_empty(self):
+        """Return True iff this _SortedListQueue is empty.
+
+        @type self: _SortedListQueue
+        @rtype: bool
+        """
+        return len(self._items) == 0
+
+
+def time_queue(queue, n, seed=148):
+    """Return the seconds taken to add and then remove <n> random events.
+
+    @type queue: Container
+    @type n: int
+    @type seed: int
+    @rtype: float
+    """
+    rng = random.Random(seed)
+    events = [NewArrive(rng.randrange(n), 'c' + str(i), 1) for i in range(n)]
+    start = time.perf_counter()
+    for event in events:
+        queue.add(event)
+    while not queue.is_empty():
+        queue.remove()
+    return time.perf_counter() - start
+
+
+def time_simulation(n):
+    """Return (seconds, stats) for a simulation run over <n> arrivals.
+
+    @type n: int
+    @rtype: (float, dict[str, object])
+    """
+    handle, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(handle)
+    try:
+        # About one arrival every four seconds, which the default store
+        # can keep up with.
+        write_event_file(filename, n, seed=148, max_items=7)
+        sim = GroceryStoreSimulation('config.json')
+        start = time.perf_counter()
+        # Read the file without the event file cache, so each run parses
+        # the text and leaves no copy of the temporary file behind.
+        stats = sim.run(create_event_list(filename, cache=False))
+        return time.perf_counter() - start, stats
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+
+    # The sorted list is quadratic: 10 ** 4 events already take seconds.
+    for n in (10 ** 3, 5 * 10 ** 3, 10 ** 4):
+        print('n={:>8}  sorted list {:8.3f}s  heap {:8.3f}s'.format(
+            n, time_queue(_SortedListQueue(), n),
+            time_queue(PriorityQueue(key=attrgetter('timestamp')), n)))
+    print('n={:>8}  heap {:8.3f}s  heap without key {:8.3f}s'.format(
+        num_events,
+        time_queue(PriorityQueue(key=attrgetter('timestamp')), num_events),
+        time_queue(PriorityQueue(), num_events)))
+    print('n={:>8}  calendar {:8.3f}s'.format(
+        num_events, time_queue(CalendarQueue(), num_events)))
+
+    seconds, stats = time_simulation(num_events)
+    print('simulation of {} arrivals: {:.3f}s {}'.format(
+        num_events, seconds, stats))
@@ -5,6 +5,39 @@ kinds of events in the simulation.
 """
 # Feel free to import classes and functions from
 # *your other files*, but remember not to import any external libraries.
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+# === Binary event files ===
+# A binary event file starts with a header of _BINARY_HEADER: the magic
+# bytes _BINARY_MAGIC, the number of records, the byte offset of the name
+# table and the number of names. The header is followed by one fixed-width
+# _BINARY_RECORD per event: timestamp, kind (_ARRIVE or _CLOSE), name id
+# and items (for arrivals) or line number (for closes). The name table
+# lists each distinct customer name once, as a 4-byte length followed by
+# its UTF-8 encoding; a name id is an index into this table.
+_BINARY_MAGIC = b'EVB1'
+_BINARY_HEADER = struct.Struct('<4sQQI')
+_BINARY_RECORD = struct.Struct('<qBIi')
+_NAME_LENGTH = struct.Struct('<I')
+_ARRIVE = 0
+_CLOSE = 1
+
+# === Event file cache ===
+# create_event_list keeps a copy of each text event file it reads in the
+# binary format, in a cache directory, named after a hash of the file's
+# path, size and modification time. Reading the copy skips parsing the
+# text. The least recently used copies are deleted once the cache holds
+# more than _CACHE_LIMIT bytes. The GROCERY_EVENT_CACHE environment
+# variable gives the cache directory, or turns the cache off if it is
+# 'off'; GROCERY_EVENT_CACHE_LIMIT gives the limit in bytes.
+_CACHE_VARIABLE = 'GROCERY_EVENT_CACHE'
+_CACHE_LIMIT_VARIABLE = 'GROCERY_EVENT_CACHE_LIMIT'
+_CACHE_LIMIT = 256 * 1024 * 1024
+_CACHE_SUFFIX = '.evb'
 
 
 class Event:
@@ -212,12 +245,14 @@ class NewArrive(Event):
         return_events = []
         which_line = store.new_join(self.timestamp, self.name, self.items)
 
-        if len(store.check_out_lines.lines[which_line].customers) == 1:
+        line = store.check_out_lines.lines[which_line]
+        if len(line.customers) == 1:
             is_first_in_line = True
         else:
             is_first_in_line = False
         if is_first_in_line:
-            return_events.append(Begin(self.timestamp, self.name))
+            return_events.append(Begin(self.timestamp, self.name,
+                                       line.customers[0]))
             return return_events
         else:
             return None
@@ -230,17 +265,19 @@ class Begin(Event):
     === Public attributes ===
     @type timestamp: int
     @type name: str
+    @type customer_id: int # the Customer's ID in the GroceryStore
     """
 
-    def __init__(self, timestamp, name):
+    def __init__(self, timestamp, name, customer_id):
         """
         Initializes a Begin event: a Customer begins checking out.
         @type self: Begin
         @type timestamp: int
         @type name: str
+        @type customer_id: int
         @rtype: None
 
-        >>> a = Begin(3, 'Jack')
+        >>> a = Begin(3, 'Jack', 0)
         >>> a.timestamp
         3
         >>> a.name
@@ -248,6 +285,7 @@ class Begin(Event):
         """
         super(Begin, self).__init__(timestamp)
         self.name = name
+        self.customer_id = customer_id
 
     def do(self, store):
         """
@@ -257,9 +295,10 @@ class Begin(Event):
         @rtype: list[Event]
         """
         return_events = []
-        check_out_time = store.begin_check_out(self.timestamp, self.name)
+        check_out_time = store.begin_check_out(self.timestamp,
+                                               self.customer_id)
         finish_time = self.timestamp + check_out_time
-        return_events.append(Finish(finish_time, self.name))
+        return_events.append(Finish(finish_time, self.name, self.customer_id))
         return return_events
 
 
@@ -269,17 +308,19 @@ class Finish(Event):
     === Public attributes ===
     @type timestamp: int
     @type name: str
+    @type customer_id: int # the Customer's ID in the GroceryStore
     """
 
-    def __init__(self, timestamp, name):
+    def __init__(self, timestamp, name, customer_id):
         """
         Initializes a Finish event: a Customer finishes checking out.
         @type self: Finish
         @type timestamp: int
         @type name: str
+        @type customer_id: int
         @rtype: None
 
-        >>> a = Finish(3, 'Jack')
+        >>> a = Finish(3, 'Jack', 0)
         >>> a.timestamp
         3
         >>> a.name
@@ -287,6 +328,7 @@ class Finish(Event):
         """
         super(Finish, self).__init__(timestamp)
         self.name = name
+        self.customer_id = customer_id
 
     def do(self, store):
         """
@@ -296,11 +338,13 @@ class Finish(Event):
         @rtype: list[Event]
         """
         return_events = []
-        next_name = store.finish_check_out(self.timestamp, self.name)
-        if next_name == None:
+        next_customer = store.finish_check_out(self.timestamp,
+                                               self.customer_id)
+        if next_customer == None:
             pass
         else:
-            return_events.append(Begin(self.timestamp, next_name))
+            return_events.append(Begin(self.timestamp, next_customer.name,
+                                       next_customer.customer_id))
             return return_events
 
 
@@ -333,47 +377,500 @@ class CloseLine(Event):
     def do(self, store):
         """
         Overrides the do method in super.
+        The displaced Customers rejoin other Lines one per second, starting
+        a second after the Line closes; see Rejoin.
         @type self: CloseLine
         @type store: GroceryStore
         @rtype: list[Event]
+
+        >>> from store import GroceryStore
+        >>> store = GroceryStore({'cashier_count': 2, 'express_count': 0,
+        ...                       'self_serve_count': 0, 'line_capacity': 10})
+        >>> for name in ['Jack', 'Jill', 'Jim', 'Fred', 'Ann']:
+        ...     _ = NewArrive(0, name, 9).do(store)
+        >>> [(type(event).__name__, event.timestamp)
+        ...  for event in CloseLine(5, 0).do(store)]
+        [('Rejoin', 6)]
         """
         return_events = []
         customers = store.close_line(self.timestamp, self.which_line)
-        for x in range(len(customers)):
+        if len(customers) > 0:
             return_events.append(
-                NewArrive(self.timestamp + 1 + x, customers[x].name,
-                           customers[x].items))
+                Rejoin(self.timestamp + 1,
+                       [customer.customer_id for customer in customers]))
+        return return_events
+
+
+class Rejoin(Event):
+    """
+    Customers displaced by a closed Line rejoin other Lines, one per
+    second: customer_ids[position] at this event's timestamp, the next one
+    a second later, and so on.
+
+    This has the same effect as a NewArrive for each of them, but each
+    Customer is assigned a Line just once, and only one event per closed
+    Line is waiting in the event queue at a time.
+
+    A NewArrive for each of them would have gone into the event queue all
+    at once, when the Line closed, and so come before any event with the
+    same timestamp that was queued after that. So that the chain keeps
+    that order, the whole chain's sequence numbers are reserved in the
+    event queue (see Container.reserve) when the first Rejoin is added,
+    and each Rejoin is added with its own.
+    === Public attributes ===
+    @type timestamp: int
+    @type customer_ids: list[int] # shared by the whole chain of events
+    @type position: int # the index of the Customer who rejoins now
+    @type sequence: int | None # the event queue sequence number to add
+        this Rejoin with, or None if none has been reserved yet
+    """
+
+    def __init__(self, timestamp, customer_ids, position=0, sequence=None):
+        """
+        Initializes a Rejoin event.
+        @type self: Rejoin
+        @type timestamp: int
+        @type customer_ids: list[int]
+        @type position: int
+        @type sequence: int | None
+        @rtype: None
+
+        >>> r = Rejoin(20, [4, 2])
+        >>> r.timestamp, r.customer_ids, r.position, r.sequence
+        (20, [4, 2], 0, None)
+        """
+        super(Rejoin, self).__init__(timestamp)
+        self.customer_ids = customer_ids
+        self.position = position
+        self.sequence = sequence
+
+    def add_to(self, events):
+        """
+        Adds this Rejoin to the event queue <events>, reserving sequence
+        numbers for the rest of the chain if this is the first.
+        @type self: Rejoin
+        @type events: Container[Event]
+        @rtype: None
+
+        >>> from container import PriorityQueue
+        >>> events = PriorityQueue(key=lambda event: event.timestamp)
+        >>> Rejoin(6, [4, 2]).add_to(events)
+        >>> events.add(Event(7))
+        >>> Rejoin(7, [4, 2], 1, 1).add_to(events)
+        >>> [type(events.remove()).__name__ for _ in range(3)]
+        ['Rejoin', 'Rejoin', 'Event']
+        """
+        if self.sequence is None:
+            self.sequence = events.reserve(len(self.customer_ids) -
+                                           self.position)
+        events.add(self, self.sequence)
+
+    def do(self, store):
+        """
+        Overrides the do method in super.
+        Spawns a Begin if the Customer is first in their new Line, and the
+        Rejoin for the next Customer, if any.
+        @type self: Rejoin
+        @type store: GroceryStore
+        @rtype: list[Event]
+
+        >>> from store import GroceryStore
+        >>> store = GroceryStore({'cashier_count': 2, 'express_count': 0,
+        ...                       'self_serve_count': 0, 'line_capacity': 10})
+        >>> for name in ['Jack', 'Jill', 'Jim', 'Fred', 'Ann']:
+        ...     _ = NewArrive(0, name, 9).do(store)
+        >>> rejoin = CloseLine(5, 0).do(store)[0]
+        >>> [(type(event).__name__, event.timestamp)
+        ...  for event in rejoin.do(store)]
+        [('Rejoin', 7)]
+        >>> store = GroceryStore({'cashier_count': 2, 'express_count': 0,
+        ...                       'self_serve_count': 0, 'line_capacity': 10})
+        >>> for name in ['Jack', 'Jill', 'Jim']:
+        ...     _ = NewArrive(0, name, 9).do(store)
+        >>> _ = Finish(4, 'Jill', store.customer_id('Jill')).do(store)
+        >>> rejoin = CloseLine(5, 0).do(store)[0]
+        >>> [(type(event).__name__, event.timestamp)
+        ...  for event in rejoin.do(store)]
+        [('Begin', 6)]
+        """
+        return_events = []
+        customer_id = self.customer_ids[self.position]
+        which_line = store.rejoin(self.timestamp, customer_id)
+        line = store.check_out_lines.lines[which_line]
+        if len(line.customers) == 1:
+            return_events.append(Begin(self.timestamp,
+                                       store.customers[customer_id].name,
+                                       customer_id))
+        if self.position + 1 < len(self.customer_ids):
+            sequence = self.sequence
+            if sequence is not None:
+                sequence += 1
+            return_events.append(Rejoin(self.timestamp + 1, self.customer_ids,
+                                        self.position + 1, sequence))
+        return return_events
+
+
+def do_batch(events, store):
+    """Perform <events>, which all have the same timestamp, in order.
+
+    Return the events spawned by all of them, in the order they would have
+    been spawned by performing each event on its own. Each run of
+    consecutive NewArrive events is handed to GroceryStore.new_join_batch
+    in one call, rather than dispatched one event at a time.
+
+    @type events: list[Event]
+    @type store: GroceryStore
+    @rtype: list[Event]
+
+    >>> from store import GroceryStore
+    >>> store = GroceryStore('config.json')
+    >>> spawned = do_batch([NewArrive(20, 'Janice', 4),
+    ...                     NewArrive(20, 'Tara', 2)], store)
+    >>> [(type(event).__name__, event.name) for event in spawned]
+    [('Begin', 'Janice'), ('Begin', 'Tara')]
+    """
+    if len(events) == 1:
+        # Most timestamps in a simulation only have one event.
+        spawned = events[0].do(store)
+        return spawned if spawned is not None else []
+
+    spawned = []
+    i = 0
+    while i < len(events):
+        event = events[i]
+        if isinstance(event, NewArrive):
+            arrivals = []
+            while i < len(events) and isinstance(events[i], NewArrive):
+                arrivals.append((events[i].name, events[i].items))
+                i += 1
+            for customer in store.new_join_batch(event.timestamp, arrivals):
+                spawned.append(Begin(event.timestamp, customer.name,
+                                     customer.customer_id))
+        else:
+            new_events = event.do(store)
+            if new_events is not None:
+                spawned.extend(new_events)
+            i += 1
+    return spawned
 
 
 # TODO: Complete this function, which creates a list of events from a file.
-def create_event_list(filename):
+def create_event_list(filename, cache=True):
     """Return a list of Events based on raw list of events in <filename>.
 
+    Text event files are cached in the binary format, so reading the same
+    unchanged file again is quicker; see _cache_file.
+
     Precondition: the file stored at <filename> is in the format specified
     by the assignment handout.
 
     @param filename: str
         The name of a file that contains the list of events.
+    @type cache: bool | str
+        Whether to use the event file cache, or the cache directory to use.
     @rtype: list[Event]
+
+    >>> events = create_event_list('events.txt', cache=False)
+    >>> len(events)
+    7
+    >>> events[5].timestamp, events[5].which_line
+    (50, 0)
+    >>> import shutil
+    >>> cache_dir = tempfile.mkdtemp()
+    >>> for _ in range(2):
+    ...     cached = create_event_list('events.txt', cache_dir)
+    ...     [vars(e) for e in cached] == [vars(e) for e in events]
+    True
+    True
+    >>> len(os.listdir(cache_dir))
+    1
+    >>> shutil.rmtree(cache_dir)
     """
-    events = []
+    cached = None
+    if cache is not False and not is_binary_event_file(filename):
+        cached = _cache_file(filename, None if cache is True else cache)
+    if cached is not None:
+        try:
+            # Mark the copy as recently used.
+            os.utime(cached)
+            return list(iter_binary_events(cached))
+        except (OSError, ValueError, struct.error):
+            # Not cached yet, or evicted or damaged: read the file itself.
+            pass
+
+    events = list(iter_events(filename))
+    if cached is not None:
+        _add_to_cache(events, cached)
+    return events
+
+
+def _cache_file(filename, cache_dir=None):
+    """Return the name the cached copy of <filename> has, or would have,
+    or None if the cache is turned off.
+
+    @type filename: str
+    @type cache_dir: str | None
+        The cache directory, if not the default.
+    @rtype: str | None
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get(_CACHE_VARIABLE)
+        if cache_dir == 'off':
+            return None
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                os.environ.get('XDG_CACHE_HOME',
+                               os.path.join(os.path.expanduser('~'),
+                                            '.cache')),
+                'grocery-events')
+    status = os.stat(filename)
+    key = '{}\0{}\0{}'.format(os.path.abspath(filename),
+                              status.st_size, status.st_mtime_ns)
+    return os.path.join(cache_dir,
+                        hashlib.sha1(key.encode()).hexdigest() + _CACHE_SUFFIX)
+
+
+def _add_to_cache(events, cached):
+    """Save <events> to the cache as <cached>, and evict old copies if the
+    cache is now too big. Do nothing if the cache cannot be written, or if
+    the events do not fit the binary format (e.g. items of 2**31 or more).
+
+    @type events: list[Event]
+    @type cached: str
+    @rtype: None
+    """
+    cache_dir = os.path.dirname(cached)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first, so that other processes never
+        # see a partly written copy.
+        handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+        os.close(handle)
+        try:
+            write_binary(events, temporary)
+            os.replace(temporary, cached)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        _evict(cache_dir, int(os.environ.get(_CACHE_LIMIT_VARIABLE,
+                                             _CACHE_LIMIT)))
+    except (OSError, struct.error):
+        # The cache is only there to save time.
+        pass
+
+
+def _evict(cache_dir, limit):
+    """Delete the least recently used copies in <cache_dir> until they take
+    up at most <limit> bytes.
+
+    @type cache_dir: str
+    @type limit: int
+    @rtype: None
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(_CACHE_SUFFIX):
+            try:
+                status = entry.stat()
+            except FileNotFoundError:
+                # Evicted by another process.
+                continue
+            entries.append((status.st_mtime, status.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def is_binary_event_file(filename):
+    """Return True iff <filename> is in the binary event file format.
+
+    @type filename: str
+    @rtype: bool
+
+    >>> is_binary_event_file('events.txt')
+    False
+    """
+    with open(filename, 'rb') as file:
+        return file.read(len(_BINARY_MAGIC)) == _BINARY_MAGIC
+
+
+def iter_events(filename):
+    """Yield the Events in <filename> one at a time, in file order.
+
+    Unlike create_event_list, only one line of the file is held in memory
+    at a time, so this can be used on event files too large to load.
+    Binary event files (see convert_to_binary) are read with
+    iter_binary_events.
+
+    Precondition: the file stored at <filename> is in the format specified
+    by the assignment handout.
+
+    @type filename: str
+        The name of a file that contains the list of events.
+    @rtype: iterator[Event]
+
+    >>> events = iter_events('events.txt')
+    >>> first = next(events)
+    >>> first.timestamp, first.name, first.items
+    (0, 'James', 7)
+    """
+    if is_binary_event_file(filename):
+        yield from iter_binary_events(filename)
+        return
     with open(filename, 'r') as file:
         for line in file:
-            # Create a list of words in the line,
-            # e.g. ['60', 'Arrive', 'Bob', '5'].
-            # Note that these are strings,
-            # and you'll need to convert some of them
-            # to ints.
-            tokens = line.split()
-            if len(tokens) == 4:
-                events.append(
-                    NewArrive(int(tokens[0]), tokens[2], int(tokens[3])))
-            elif len(tokens) == 3:
-                events.append(CloseLine(int(tokens[0]), int(tokens[2])))
-    return events
+            event = parse_event_line(line)
+            if event is not None:
+                yield event
+
+
+def parse_event_line(line):
+    """Return the Event described by one line of an event file, or None if
+    the line describes no event (e.g. it is blank).
+
+    @type line: str
+    @rtype: Event | None
+
+    >>> parse_event_line('60 Arrive Bob 5').name
+    'Bob'
+    >>> parse_event_line('70 Close 2').which_line
+    2
+    >>> parse_event_line('') is None
+    True
+    """
+    # Create a list of words in the line,
+    # e.g. ['60', 'Arrive', 'Bob', '5'].
+    # Note that these are strings,
+    # and you'll need to convert some of them
+    # to ints.
+    tokens = line.split()
+    if len(tokens) == 4:
+        return NewArrive(int(tokens[0]), tokens[2], int(tokens[3]))
+    elif len(tokens) == 3:
+        return CloseLine(int(tokens[0]), int(tokens[2]))
+    return None
+
+
+def convert_to_binary(text_filename, binary_filename):
+    """Convert the text event file <text_filename> to the binary format.
+
+    Return the number of events written to <binary_filename>. Reading the
+    binary file back gives the same events, in the same order.
+
+    @type text_filename: str
+    @type binary_filename: str
+    @rtype: int
+    """
+    return write_binary(iter_events(text_filename), binary_filename)
+
+
+def write_binary(events, binary_filename):
+    """Write <events> to <binary_filename> in the binary format, and return
+    how many there were.
+
+    @type events: iterable[Event]
+        Only NewArrive and CloseLine events.
+    @type binary_filename: str
+    @rtype: int
+    """
+    names = {}
+    count = 0
+    with open(binary_filename, 'wb') as file:
+        file.write(_BINARY_HEADER.pack(_BINARY_MAGIC, 0, 0, 0))
+        for event in events:
+            if isinstance(event, NewArrive):
+                name_id = names.setdefault(event.name, len(names))
+                file.write(_BINARY_RECORD.pack(
+                    event.timestamp, _ARRIVE, name_id, event.items))
+            else:
+                file.write(_BINARY_RECORD.pack(
+                    event.timestamp, _CLOSE, 0, event.which_line))
+            count += 1
+
+        names_offset = file.tell()
+        # dicts remember insertion order, which is name id order.
+        for name in names:
+            encoded = name.encode('utf-8')
+            file.write(_NAME_LENGTH.pack(len(encoded)))
+            file.write(encoded)
+
+        file.seek(0)
+        file.write(_BINARY_HEADER.pack(
+            _BINARY_MAGIC, count, names_offset, len(names)))
+    return count
+
+
+def iter_binary_events(filename):
+    """Yield the Events in the binary event file <filename>, in file order.
+
+    The file is memory-mapped and records are unpacked straight from the
+    mapping, so no text is parsed. Each distinct name is decoded only
+    once, and every event for that name shares the same string.
+
+    Precondition: <filename> was written by convert_to_binary.
+
+    @type filename: str
+    @rtype: iterator[Event]
+
+    >>> import os, tempfile
+    >>> handle, binary = tempfile.mkstemp()
+    >>> os.close(handle)
+    >>> convert_to_binary('events.txt', binary)
+    7
+    >>> text_events = create_event_list('events.txt', cache=False)
+    >>> binary_events = list(iter_binary_events(binary))
+    >>> [vars(e) for e in binary_events] == [vars(e) for e in text_events]
+    True
+    >>> os.remove(binary)
+    """
+    with open(filename, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    try:
+        magic, count, names_offset, name_count = \
+            _BINARY_HEADER.unpack_from(view)
+        if magic != _BINARY_MAGIC:
+            raise ValueError('{} is not a binary event file'.format(filename))
+
+        names = []
+        offset = names_offset
+        for _ in range(name_count):
+            length = _NAME_LENGTH.unpack_from(view, offset)[0]
+            offset += _NAME_LENGTH.size
+            names.append(str(view[offset:offset + length], 'utf-8'))
+            offset += length
+
+        start = _BINARY_HEADER.size
+        records = view[start:start + count * _BINARY_RECORD.size]
+        try:
+            for timestamp, kind, name_id, value in \
+                    _BINARY_RECORD.iter_unpack(records):
+                if kind == _ARRIVE:
+                    yield NewArrive(timestamp, names[name_id], value)
+                else:
+                    yield CloseLine(timestamp, value)
+        finally:
+            records.release()
+    finally:
+        view.release()
+        mapping.close()
 
 
 if __name__ == '__main__':
-    import doctest
+    import sys
+
+    # python event.py <text file> <binary file> converts an event file to
+    # the binary format.
+    if len(sys.argv) == 3:
+        print('Wrote {} events'.format(
+            convert_to_binary(sys.argv[1], sys.argv[2])))
+    else:
+        import doctest
 
-    doctest.testmod()
+        doctest.testmod()
@@ -0,0 +1,234 @@
+"""A fast path for grocery store simulations with a single check out line.
+
+When a store has only one line, every customer joins it, whatever its
+capacity (assign_customer falls back to the last line when none fits). If
+the event file has no Close events either, the line is a first-come,
+first-served queue with one server, and each customer's finish time
+follows from the Lindley recurrence
+
+    finish[i] = max(arrival[i], finish[i - 1]) + service[i]
+
+which needs no event queue at all. Unrolled, it is
+
+    finish[i] = S[i] + max(arrival[j] - S[j - 1] for j <= i)
+
+where S is the running total of the service times, so with NumPy it is a
+cumulative sum and a cumulative maximum over arrays. Without NumPy, the
+recurrence is computed in a plain loop.
+
+This is used by GroceryStoreSimulation when the 'engine' configuration
+setting asks for it.
+"""
+from event import NewArrive, iter_events, is_binary_event_file, \
+    _BINARY_HEADER, _BINARY_RECORD, _ARRIVE
+from store import CashierLine, ExpressLine, SelfServeLine, Customer
+
+try:
+    import numpy
+except ImportError:
+    # Fall back to computing the recurrence in Python.
+    numpy = None
+
+# The configuration setting giving the number of each kind of line.
+_LINE_COUNTS = [('cashier_count', CashierLine),
+                ('express_count', ExpressLine),
+                ('self_serve_count', SelfServeLine)]
+
+
+def single_line_kind(config):
+    """Return the class of the store's line, if the store described by
+    <config> has exactly one line, and None otherwise.
+
+    @type config: dict[str, object]
+    @rtype: type | None
+
+    >>> single_line_kind({'cashier_count': 0, 'express_count': 1,
+    ...                   'self_serve_count': 0, 'line_capacity': 10})
+    <class 'store.ExpressLine'>
+    >>> single_line_kind({'cashier_count': 1, 'express_count': 1,
+    ...                   'self_serve_count': 0, 'line_capacity': 10}) is None
+    True
+    """
+    kinds = []
+    for key, kind in _LINE_COUNTS:
+        kinds.extend([kind] * config[key])
+    return kinds[0] if len(kinds) == 1 else None
+
+
+def read_arrivals(event_file):
+    """Return the arrival times and item counts of the customers in
+    <event_file>, in order of arrival, or None if the fast path cannot
+    simulate it.
+
+    It cannot if the file has a Close event, is not in timestamp order, or
+    has two customers with the same name. A text event file is only read
+    up to the first line showing that. With NumPy, binary event files are
+    read straight into arrays.
+
+    @type event_file: str | list[Event]
+        An event file, or the events themselves.
+    @rtype: (list[int], list[int]) | (numpy.ndarray, numpy.ndarray) | None
+
+    >>> read_arrivals('events.txt') is None
+    True
+    >>> from event import NewArrive
+    >>> read_arrivals([NewArrive(0, 'Jack', 3), NewArrive(2, 'Jill', 5)])
+    ([0, 2], [3, 5])
+    """
+    if numpy is not None and isinstance(event_file, str) and \
+            is_binary_event_file(event_file):
+        return _read_binary_arrivals(event_file)
+    if isinstance(event_file, str) and not is_binary_event_file(event_file):
+        return _read_text_arrivals(event_file)
+
+    events = iter_events(event_file) if isinstance(event_file, str) \
+        else event_file
+    timestamps = []
+    items = []
+    names = set()
+    for event in events:
+        if type(event) is not NewArrive or event.name in names or \
+                (timestamps and event.timestamp < timestamps[-1]):
+            return None
+        names.add(event.name)
+        timestamps.append(event.timestamp)
+        items.append(event.items)
+    return timestamps, items
+
+
+def _read_text_arrivals(filename):
+    """Return read_arrivals(<filename>) for a text event file.
+
+    Each line is checked as it is read, before any Event is made from it,
+    so reading stops at the first line the fast path cannot simulate.
+
+    @type filename: str
+    @rtype: (list[int], list[int]) | None
+    """
+    timestamps = []
+    items = []
+    names = set()
+    with open(filename, 'r') as file:
+        for line in file:
+            # Lines are split as parse_event_line splits them: four words
+            # for an arrival, three for a close, and anything else is not
+            # an event.
+            tokens = line.split()
+            if len(tokens) == 3:
+                return None
+            if len(tokens) != 4:
+                continue
+            timestamp = int(tokens[0])
+            if tokens[2] in names or \
+                    (timestamps and timestamp < timestamps[-1]):
+                return None
+            names.add(tokens[2])
+            timestamps.append(timestamp)
+            items.append(int(tokens[3]))
+    return timestamps, items
+
+
+def _read_binary_arrivals(filename):
+    """Return read_arrivals(<filename>) for a binary event file, as NumPy
+    arrays.
+
+    @type filename: str
+    @rtype: (numpy.ndarray, numpy.ndarray) | None
+    """
+    with open(filename, 'rb') as file:
+        header = file.read(_BINARY_HEADER.size)
+        _, count, _, name_count = _BINARY_HEADER.unpack(header)
+        records = numpy.fromfile(file, dtype=_BINARY_DTYPE, count=count)
+    # Names are stored once each, so the names are all different exactly
+    # when there are as many as there are events.
+    if name_count != count or (records['kind'] != _ARRIVE).any():
+        return None
+    timestamps = records['timestamp']
+    if (timestamps[1:] < timestamps[:-1]).any():
+        return None
+    return timestamps, records['value'].astype(numpy.int64)
+
+
+def simulate(kind, timestamps, items):
+    """Return the stats of simulating customers arriving at <timestamps>
+    with <items> at a store with a single line of class <kind>.
+
+    The stats are the same as GroceryStoreSimulation.run would report.
+
+    @type kind: type
+    @type timestamps: list[int] | numpy.ndarray
+        Precondition: in non-decreasing order.
+    @type items: list[int] | numpy.ndarray
+    @rtype: dict[str, int]
+
+    >>> simulate(CashierLine, [0, 2, 30], [3, 5, 1])
+    {'num_customers': 3, 'total_time': 38, 'max_wait': 20}
+    """
+    # Check out times are linear in the number of items; read the
+    # coefficients off the line class.
+    line = kind(1, kind is ExpressLine)
+    fixed = line.get_check_out_time(Customer('', 0))
+    per_item = line.get_check_out_time(Customer('', 1)) - fixed
+
+    if len(timestamps) == 0:
+        return {'num_customers': 0, 'total_time': 0, 'max_wait': -1}
+    if numpy is not None:
+        finish_time, max_wait = _lindley_arrays(
+            numpy.asarray(timestamps, dtype=numpy.int64),
+            numpy.asarray(items, dtype=numpy.int64), per_item, fixed)
+    else:
+        finish_time, max_wait = _lindley_loop(timestamps, items, per_item,
+                                              fixed)
+    return {'num_customers': len(timestamps), 'total_time': finish_time,
+            'max_wait': max_wait}
+
+
+def _lindley_arrays(timestamps, items, per_item, fixed):
+    """Return the last finish time and the longest wait of the customers,
+    using NumPy.
+
+    @type timestamps: numpy.ndarray
+    @type items: numpy.ndarray
+    @type per_item: int
+    @type fixed: int
+    @rtype: (int, int)
+    """
+    service = items * per_item + fixed
+    total = numpy.cumsum(service)
+    # total - service is the service time of everyone before each customer.
+    finish = total + numpy.maximum.accumulate(timestamps - (total - service))
+    return int(finish[-1]), int((finish - timestamps).max())
+
+
+def _lindley_loop(timestamps, items, per_item, fixed):
+    """Return the last finish time and the longest wait of the customers,
+    in plain Python.
+
+    @type timestamps: list[int]
+    @type items: list[int]
+    @type per_item: int
+    @type fixed: int
+    @rtype: (int, int)
+    """
+    finish = timestamps[0]
+    max_wait = -1
+    for timestamp, num_items in zip(timestamps, items):
+        if timestamp > finish:
+            finish = timestamp
+        finish += num_items * per_item + fixed
+        if finish - timestamp > max_wait:
+            max_wait = finish - timestamp
+    return finish, max_wait
+
+
+if numpy is not None:
+    # A binary event file record (see event.py) as a NumPy structured type.
+    _BINARY_DTYPE = numpy.dtype([('timestamp', '<i8'), ('kind', 'u1'),
+                                 ('name_id', '<u4'), ('value', '<i4')])
+    assert _BINARY_DTYPE.itemsize == _BINARY_RECORD.size
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,163 @@
+"""Simulations of a chain of grocery stores.
+
+Each store in the chain has its own configuration and its own event file,
+and the stores do not affect one another, so each one is simulated in a
+separate worker process. Results are streamed back as each store finishes,
+and combined into stats for the whole chain.
+
+A manifest is a JSON file listing the stores, e.g.
+
+    [{"name": "downtown", "config": "downtown.json",
+      "events": "downtown_events.txt"},
+     {"name": "airport", "config": {"cashier_count": 2, ...},
+      "events": "airport_events.bin"}]
+
+Relative file names are relative to the manifest. "name" is optional, and
+defaults to the store's position in the manifest. No two stores may have
+the same name, since results are reported by name.
+
+Usage:
+    python multistore.py chain.json [--processes 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+
+from simulation import GroceryStoreSimulation
+
+
+def load_manifest(filename):
+    """Return the stores listed in the manifest <filename>.
+
+    Each store is a dictionary with a 'name', a 'config' (a file name or
+    the configuration itself) and an 'events' file name. File names are
+    made relative to the current directory. Raise ValueError if two
+    stores have the same name.
+
+    @type filename: str
+    @rtype: list[dict[str, object]]
+    """
+    with open(filename, 'r') as file:
+        entries = json.load(file)
+    base = os.path.dirname(filename)
+    stores = []
+    for i, entry in enumerate(entries):
+        config = entry['config']
+        if isinstance(config, str):
+            config = os.path.join(base, config)
+        stores.append({'name': entry.get('name', str(i)), 'config': config,
+                       'events': os.path.join(base, entry['events'])})
+    _check_names(stores)
+    return stores
+
+
+def _check_names(stores):
+    """Raise ValueError if two of <stores> have the same name.
+
+    @type stores: list[dict[str, object]]
+    @rtype: None
+
+    >>> _check_names([{'name': 'a'}, {'name': '1'}, {'name': '1'}])
+    Traceback (most recent call last):
+    ...
+    ValueError: More than one store is named '1'
+    """
+    names = set()
+    for store in stores:
+        if store['name'] in names:
+            raise ValueError('More than one store is named {!r}'.format(
+                store['name']))
+        names.add(store['name'])
+
+
+def iter_store_stats(stores, processes=None):
+    """Simulate each of <stores> in a pool of worker processes, and yield
+    (name, stats) pairs as the stores finish, in whatever order that is.
+    Raise ValueError if two stores have the same name.
+
+    @type stores: list[dict[str, object]]
+        As returned by load_manifest.
+    @type processes: int | None
+        The number of worker processes; by default, one per CPU.
+    @rtype: iterator[(str, dict[str, object])]
+    """
+    _check_names(stores)
+    with multiprocessing.Pool(processes) as pool:
+        # Each store is a task of its own: a long-running store then only
+        # ties up one worker while the others carry on.
+        for result in pool.imap_unordered(_run_store, stores, chunksize=1):
+            yield result
+
+
+def _run_store(store):
+    """Return the name and stats of simulating <store>.
+
+    @type store: dict[str, object]
+    @rtype: (str, dict[str, object])
+    """
+    stats = GroceryStoreSimulation(store['config']).run(store['events'])
+    return store['name'], stats
+
+
+def merge_stats(store_stats):
+    """Return the stats of a whole chain, given the stats of its stores.
+
+    Customers are added up across stores, while the total time and the
+    longest wait are the largest of any store.
+
+    @type store_stats: iterable[dict[str, object]]
+    @rtype: dict[str, object]
+
+    >>> merge_stats([{'num_customers': 6, 'total_time': 86, 'max_wait': 21},
+    ...              {'num_customers': 4, 'total_time': 90, 'max_wait': 9}])
+    {'num_customers': 10, 'total_time': 90, 'max_wait': 21}
+    >>> merge_stats([])
+    {'num_customers': 0, 'total_time': 0, 'max_wait': -1}
+    """
+    merged = {'num_customers': 0, 'total_time': 0, 'max_wait': -1}
+    for stats in store_stats:
+        merged['num_customers'] += stats['num_customers']
+        merged['total_time'] = max(merged['total_time'], stats['total_time'])
+        merged['max_wait'] = max(merged['max_wait'], stats['max_wait'])
+    return merged
+
+
+def run_chain(stores, processes=None):
+    """Simulate <stores> and return the stats of each, by name, and of the
+    chain as a whole.
+
+    @type stores: list[dict[str, object]]
+    @type processes: int | None
+    @rtype: (dict[str, dict[str, object]], dict[str, object])
+
+    >>> stores = [{'name': 'a', 'config': dict(cashier_count=1,
+    ...               express_count=1, self_serve_count=1, line_capacity=10,
+    ...               event_cache=False), 'events': 'events.txt'},
+    ...           {'name': 'b', 'config': dict(cashier_count=1,
+    ...               express_count=0, self_serve_count=0, line_capacity=10,
+    ...               event_cache=False), 'events': 'events.txt'}]
+    >>> by_store, chain = run_chain(stores, processes=2)
+    >>> sorted(by_store)
+    ['a', 'b']
+    >>> chain['num_customers']
+    12
+    """
+    by_store = dict(iter_store_stats(stores, processes))
+    return by_store, merge_stats(by_store.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Simulate every store in a chain.')
+    parser.add_argument('manifest', help='the JSON list of stores')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of worker processes (default: CPUs)')
+    args = parser.parse_args()
+
+    results = {}
+    for store_name, store_stats in iter_store_stats(
+            load_manifest(args.manifest), args.processes):
+        print(store_name, json.dumps(store_stats), flush=True)
+        results[store_name] = store_stats
+    print('chain', json.dumps(merge_stats(results.values())))
@@ -0,0 +1,227 @@
+"""Opt-in profiling for the grocery store simulation.
+
+This file contains the classes GroceryStoreSimulation uses, when profiling
+is switched on, to time each kind of event and the event queue.
+"""
+from time import perf_counter
+
+from container import Container
+from event import do_batch
+
+
+class EventProfiler:
+    """Call counts and wall clock times of Event.do, per Event subclass.
+
+    === Public attributes ===
+    @type timings: dict[str, list[int | float]]
+        Maps each Event subclass name to [count, total seconds,
+        max seconds] over the events of that class performed so far.
+    """
+
+    def __init__(self):
+        """Initialize an EventProfiler that has timed no events.
+
+        @type self: EventProfiler
+        @rtype: None
+        """
+        self.timings = {}
+
+    def do(self, event, store):
+        """Perform <event> on <store>, timing it, and return what it spawns.
+
+        @type self: EventProfiler
+        @type event: Event
+        @type store: GroceryStore
+        @rtype: list[Event] | None
+
+        >>> from store import GroceryStore
+        >>> from event import NewArrive
+        >>> profiler = EventProfiler()
+        >>> spawned = profiler.do(NewArrive(0, 'Jack', 3),
+        ...                       GroceryStore('config.json'))
+        >>> type(spawned[0]).__name__
+        'Begin'
+        >>> profiler.timings['NewArrive'][0]
+        1
+        """
+        return self._time(type(event).__name__, event.do, store)
+
+    def do_batch(self, events, store):
+        """Perform the batch <events> on <store> with event.do_batch, timing
+        it as a single 'Batch' event, and return what it spawns.
+
+        @type self: EventProfiler
+        @type events: list[Event]
+        @type store: GroceryStore
+        @rtype: list[Event]
+        """
+        return self._time('Batch', do_batch, events, store)
+
+    def _time(self, name, function, *args):
+        """Call <function> with <args>, timing it under <name>, and return
+        its result.
+
+        @type self: EventProfiler
+        @type name: str
+        @type function: callable
+        @type args: list[object]
+        @rtype: object
+        """
+        start = perf_counter()
+        result = function(*args)
+        elapsed = perf_counter() - start
+
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [1, elapsed, elapsed]
+        else:
+            timing[0] += 1
+            timing[1] += elapsed
+            if elapsed > timing[2]:
+                timing[2] = elapsed
+        return result
+
+    def summary(self):
+        """Return the timings as a dictionary for the simulation stats.
+
+        @type self: EventProfiler
+        @rtype: dict[str, dict[str, int | float]]
+
+        >>> profiler = EventProfiler()
+        >>> profiler.timings['Begin'] = [2, 0.5, 0.375]
+        >>> profiler.summary()
+        {'Begin': {'count': 2, 'total_seconds': 0.5, 'max_seconds': 0.375}}
+        """
+        return {name: {'count': count, 'total_seconds': total,
+                       'max_seconds': longest}
+                for name, (count, total, longest) in self.timings.items()}
+
+
+class TimedContainer(Container):
+    """A Container which times the operations of another Container.
+
+    Items are added to and removed from the wrapped container as usual;
+    this only keeps track of how long that takes and how many items the
+    container has held at once.
+
+    === Public attributes ===
+    @type adds: int
+    @type removes: int
+    @type seconds: float
+        The total time spent in add and remove.
+    @type size: int
+        The number of items in the container.
+    @type high_water: int
+        The largest number of items the container has held.
+    """
+    # === Private Attributes ===
+    # @type _container: Container
+    #     The container being timed.
+
+    def __init__(self, container):
+        """Initialize a TimedContainer around <container>.
+
+        Precondition: <container> is empty.
+
+        @type self: TimedContainer
+        @type container: Container
+        @rtype: None
+        """
+        self._container = container
+        self.adds = 0
+        self.removes = 0
+        self.seconds = 0.0
+        self.size = 0
+        self.high_water = 0
+
+    def add(self, item, sequence=None):
+        """Add <item> to the wrapped container.
+
+        @type self: TimedContainer
+        @type item: object
+        @type sequence: int | None
+        @rtype: None
+
+        >>> from container import PriorityQueue
+        >>> queue = TimedContainer(PriorityQueue())
+        >>> queue.add('fred')
+        >>> queue.add('arju')
+        >>> queue.remove()
+        'arju'
+        >>> queue.high_water, queue.size
+        (2, 1)
+        """
+        start = perf_counter()
+        self._container.add(item, sequence)
+        self.seconds += perf_counter() - start
+        self.adds += 1
+        self.size += 1
+        if self.size > self.high_water:
+            self.high_water = self.size
+
+    def reserve(self, count):
+        """Reserve <count> sequence numbers in the wrapped container.
+
+        @type self: TimedContainer
+        @type count: int
+        @rtype: int
+        """
+        return self._container.reserve(count)
+
+    def remove(self):
+        """Remove and return the next item from the wrapped container.
+
+        @type self: TimedContainer
+        @rtype: object
+        """
+        start = perf_counter()
+        item = self._container.remove()
+        self.seconds += perf_counter() - start
+        self.removes += 1
+        self.size -= 1
+        return item
+
+    def remove_batch(self):
+        """Remove and return the next items of equal priority from the
+        wrapped container.
+
+        @type self: TimedContainer
+        @rtype: list[object]
+        """
+        start = perf_counter()
+        batch = self._container.remove_batch()
+        self.seconds += perf_counter() - start
+        self.removes += len(batch)
+        self.size -= len(batch)
+        return batch
+
+    def is_empty(self):
+        """Return True iff the wrapped container is empty.
+
+        @type self: TimedContainer
+        @rtype: bool
+        """
+        return self._container.is_empty()
+
+    def peek(self):
+        """Return the next item of the wrapped container without removing it.
+
+        @type self: TimedContainer
+        @rtype: object
+        """
+        return self._container.peek()
+
+    def summary(self):
+        """Return the queue timings as a dictionary for the simulation stats.
+
+        @type self: TimedContainer
+        @rtype: dict[str, int | float]
+        """
+        return {'adds': self.adds, 'removes': self.removes,
+                'total_seconds': self.seconds, 'high_water': self.high_water}
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
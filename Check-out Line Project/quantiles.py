@@ -0,0 +1,252 @@
+"""Constant-memory waiting time distributions for the grocery store.
+
+This file contains a streaming quantile estimator, and a summary of
+customer waiting times built on it which the GroceryStore can keep up to
+date as customers finish checking out.
+"""
+
+
+class P2Quantile:
+    """An estimate of one quantile of a stream of numbers.
+
+    Uses the P-squared algorithm (Jain and Chlamtac, 1985): five markers
+    track the minimum, the maximum, the quantile itself and two points
+    either side of it, and are nudged towards their ideal positions as each
+    number arrives. Memory and time per number are constant, however many
+    numbers are added. Until five numbers have been seen, the quantile is
+    computed exactly.
+
+    === Public attributes ===
+    @type p: float
+        The quantile being estimated, between 0 and 1 (0.5 is the median).
+    @type count: int
+        How many numbers have been added.
+    """
+    # === Private Attributes ===
+    # @type _heights: list[float]
+    #     The heights of the five markers, in non-decreasing order. Before
+    #     five numbers have been added, just the numbers seen so far.
+    # @type _positions: list[int]
+    #     The positions of the markers among the numbers seen so far.
+    # @type _desired: list[float]
+    #     The ideal positions of the markers.
+    # @type _increments: list[float]
+    #     How far each ideal position moves when a number is added.
+
+    def __init__(self, p):
+        """Initialize a P2Quantile for quantile <p>.
+
+        @type self: P2Quantile
+        @type p: float
+            Precondition: 0 <= p <= 1.
+        @rtype: None
+        """
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        """Add the number <x> to the stream.
+
+        @type self: P2Quantile
+        @type x: int | float
+        @rtype: None
+
+        >>> median = P2Quantile(0.5)
+        >>> for x in [5, 1, 4, 2, 3]:
+        ...     median.add(x)
+        >>> median.value()
+        3
+        """
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # Find the cell k with heights[k] <= x < heights[k + 1], widening
+        # the outer markers if x falls outside them.
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+
+        positions = self._positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, step)
+                heights[i] = height
+                positions[i] += step
+
+    def value(self):
+        """Return the current estimate of the quantile.
+
+        Precondition: at least one number has been added.
+
+        @type self: P2Quantile
+        @rtype: int | float
+
+        >>> import random
+        >>> rng = random.Random(148)
+        >>> numbers = list(range(1, 10001))
+        >>> rng.shuffle(numbers)
+        >>> p95 = P2Quantile(0.95)
+        >>> for x in numbers:
+        ...     p95.add(x)
+        >>> abs(p95.value() - 9500) < 50
+        True
+        """
+        if self.count <= 5:
+            index = int(round(self.p * (len(self._heights) - 1)))
+            return self._heights[index]
+        return self._heights[2]
+
+    def _parabolic(self, i, step):
+        """Return the piecewise-parabolic adjustment of marker <i>.
+
+        @type self: P2Quantile
+        @type i: int
+        @type step: int
+        @rtype: float
+        """
+        q = self._heights
+        n = self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def _linear(self, i, step):
+        """Return the linear adjustment of marker <i>.
+
+        @type self: P2Quantile
+        @type i: int
+        @type step: int
+        @rtype: float
+        """
+        q = self._heights
+        n = self._positions
+        return q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+
+
+class WaitDistribution:
+    """Waiting time quantiles and throughput, overall and per line type.
+
+    Line types are named by the class of the line, e.g. 'CashierLine'.
+
+    === Public attributes ===
+    @type quantiles: list[float]
+        The quantiles tracked, e.g. 0.5 for the median wait.
+    """
+    # === Private Attributes ===
+    # @type _overall: list[P2Quantile]
+    #     One estimator per quantile, over every customer.
+    # @type _by_line_type: dict[str, list[P2Quantile]]
+    #     One estimator per quantile for each line type seen so far.
+
+    def __init__(self, quantiles=(0.5, 0.95, 0.99)):
+        """Initialize an empty WaitDistribution.
+
+        @type self: WaitDistribution
+        @type quantiles: iterable[float]
+        @rtype: None
+        """
+        self.quantiles = list(quantiles)
+        self._overall = [P2Quantile(p) for p in self.quantiles]
+        self._by_line_type = {}
+
+    def record(self, customer, line):
+        """Add a Customer who has finished checking out at <line>.
+
+        @type self: WaitDistribution
+        @type customer: Customer
+        @type line: Line
+        @rtype: None
+        """
+        wait = customer.get_wait_time()
+        line_type = type(line).__name__
+        estimators = self._by_line_type.get(line_type)
+        if estimators is None:
+            estimators = [P2Quantile(p) for p in self.quantiles]
+            self._by_line_type[line_type] = estimators
+        for estimator in self._overall:
+            estimator.add(wait)
+        for estimator in estimators:
+            estimator.add(wait)
+
+    def summary(self, total_time):
+        """Return the distribution as entries for the simulation stats.
+
+        There is one 'wait_pNN' entry per quantile, plus a 'line_types'
+        entry which maps each line type to its number of customers, its
+        throughput (customers per second of <total_time>) and its own
+        'wait_pNN' entries. Quantiles with no customers are None.
+
+        @type self: WaitDistribution
+        @type total_time: int
+        @rtype: dict[str, object]
+
+        >>> from store import Customer, CashierLine
+        >>> distribution = WaitDistribution([0.5])
+        >>> jack = Customer('Jack', 3)
+        >>> jack.end_waiting = 10
+        >>> distribution.record(jack, CashierLine(10, False))
+        >>> summary = distribution.summary(20)
+        >>> summary['wait_p50']
+        10
+        >>> summary['line_types']['CashierLine']['throughput']
+        0.05
+        """
+        summary = _quantile_entries(self._overall)
+        line_types = {}
+        for line_type, estimators in self._by_line_type.items():
+            entry = {
+                'num_customers': estimators[0].count,
+                'throughput': estimators[0].count / total_time
+                if total_time > 0 else 0.0
+            }
+            entry.update(_quantile_entries(estimators))
+            line_types[line_type] = entry
+        summary['line_types'] = line_types
+        return summary
+
+
+def _quantile_entries(estimators):
+    """Return a 'wait_pNN' entry for each of <estimators>.
+
+    @type estimators: list[P2Quantile]
+    @rtype: dict[str, int | float | None]
+
+    >>> _quantile_entries([P2Quantile(0.5), P2Quantile(0.999)])
+    {'wait_p50': None, 'wait_p99.9': None}
+    """
+    entries = {}
+    for estimator in estimators:
+        name = 'wait_p{:g}'.format(estimator.p * 100)
+        entries[name] = estimator.value() if estimator.count > 0 else None
+    return entries
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,315 @@
+"""Line lengths of a grocery store over simulated time, in fixed memory.
+
+A QueueSampler is told by the GroceryStore whenever a line's length or
+open/closed state changes. It keeps, for each line, the minimum, maximum
+and time-weighted mean length and the open/closed state over fixed
+intervals of simulated time.
+
+The intervals are kept in preallocated ring buffers, one per level of
+detail, in the manner of a round-robin database. Level 0 has the finest
+intervals; each level after it has intervals <factor> times as long. Each
+level holds its latest <capacity> intervals and overwrites the oldest
+when full, so with the defaults a simulated week is still covered at
+hourly detail after minute detail has rolled over. Each change is added
+to every level directly, so it costs the same whatever the horizon.
+
+Pass a QueueSampler to GroceryStoreSimulation.run to fill it in.
+"""
+from array import array
+
+# The interval of level 0, in seconds.
+_INTERVAL = 60
+# The number of intervals kept at each level.
+_CAPACITY = 1024
+# The number of levels.
+_LEVELS = 3
+# How many times longer each level's intervals are than the previous.
+_FACTOR = 60
+
+
+class QueueSampler:
+    """The lengths of the lines of a grocery store over simulated time.
+
+    Changes must be recorded in non-decreasing timestamp order.
+
+    === Public attributes ===
+    @type archives: list[SampleArchive]
+        The intervals at each level, finest first.
+
+    >>> from store import LineList
+    >>> lines = LineList(2, 0, 0, 10)
+    >>> sampler = QueueSampler(interval=10, capacity=4, levels=2, factor=3)
+    >>> sampler.attach(lines)
+    >>> lines.lines[0].customers.extend([0, 1])
+    >>> sampler.record(5, 0)
+    >>> lines.lines[0].customers.popleft()
+    0
+    >>> sampler.record(25, 0)
+    >>> sampler.advance(30)
+    >>> series = sampler.series()
+    >>> series['start']
+    [0, 10, 20]
+    >>> series['lines'][0]
+    {'min': [0, 2, 1], 'max': [2, 2, 2], 'mean': [1.0, 2.0, 1.5], \
+'closed': [False, False, False]}
+    >>> sampler.series(1)['start']
+    [0]
+    >>> sampler.series(1)['lines'][0]['mean']
+    [1.5]
+    """
+    # === Private Attributes ===
+    # @type _lines: list[Line] | None
+    #     The lines being sampled, once attached.
+    # @type _lengths: list[int]
+    #     The number of customers in each line as of the last change.
+    # @type _closed: list[bool]
+    #     Whether each line was closed as of the last change.
+
+    def __init__(self, interval=_INTERVAL, capacity=_CAPACITY,
+                 levels=_LEVELS, factor=_FACTOR):
+        """Initialize a QueueSampler which is not yet attached to a store.
+
+        @type self: QueueSampler
+        @type interval: int
+            The length of each interval of level 0, in seconds.
+        @type capacity: int
+            The number of intervals kept at each level.
+        @type levels: int
+        @type factor: int
+            How many times longer each level's intervals are than the
+            previous level's.
+        @rtype: None
+        """
+        self.archives = [SampleArchive(interval * factor ** level, capacity)
+                         for level in range(levels)]
+        self._lines = None
+        self._lengths = []
+        self._closed = []
+
+    def attach(self, check_out_lines):
+        """Start sampling <check_out_lines> at time 0.
+
+        @type self: QueueSampler
+        @type check_out_lines: LineList
+        @rtype: None
+        """
+        self._lines = check_out_lines.lines
+        self._lengths = [len(line.customers) for line in self._lines]
+        self._closed = [line.closed for line in self._lines]
+        for archive in self.archives:
+            archive.start(self._lengths)
+
+    def record(self, timestamp, which_line):
+        """Record that line <which_line> changed at time <timestamp>.
+
+        @type self: QueueSampler
+        @type timestamp: int
+        @type which_line: int
+        @rtype: None
+        """
+        lengths = self._lengths
+        old = lengths[which_line]
+        line = self._lines[which_line]
+        new = len(line.customers)
+        for archive in self.archives:
+            if timestamp >= archive.end:
+                # The intervals before the change end with the line as it
+                # was, not as it is now.
+                archive.advance(timestamp, lengths, self._closed)
+            archive.change(timestamp, which_line, old, new)
+        lengths[which_line] = new
+        self._closed[which_line] = line.closed
+
+    def advance(self, timestamp):
+        """Complete every interval which ends by time <timestamp>, with no
+        further changes to the lines.
+
+        @type self: QueueSampler
+        @type timestamp: int
+        @rtype: None
+        """
+        for archive in self.archives:
+            archive.advance(timestamp, self._lengths, self._closed)
+
+    def series(self, level=0):
+        """Return the completed intervals at <level>, oldest first.
+
+        The result has the interval length under 'interval', the start
+        time of each interval under 'start', and under 'lines', for each
+        line, the 'min', 'max' and 'mean' number of customers and whether
+        the line was 'closed' at the end of each interval.
+
+        @type self: QueueSampler
+        @type level: int
+        @rtype: dict[str, object]
+        """
+        return self.archives[level].series()
+
+
+class SampleArchive:
+    """The completed intervals of one level of a QueueSampler, in a ring
+    buffer, and the interval in progress.
+
+    === Public attributes ===
+    @type interval: int
+        The length of each interval, in seconds.
+    @type capacity: int
+        The number of completed intervals kept.
+    @type end: int
+        The end time of the interval in progress.
+    """
+    # === Private Attributes ===
+    # @type _count: int
+    #     The number of completed intervals kept, at most capacity.
+    # @type _next: int
+    #     The slot of the ring to write the next completed interval into.
+    # @type _starts: array[int]
+    #     The start time of the interval in each slot.
+    # @type _mins: array[int]
+    # @type _maxes: array[int]
+    # @type _means: array[float]
+    # @type _closed: bytearray
+    #     The values for line i of the interval in slot s are at index
+    #     s * (number of lines) + i.
+    # @type _low: list[int]
+    # @type _high: list[int]
+    #     The shortest and longest each line has been in the interval in
+    #     progress.
+    # @type _area: list[int]
+    #     The sum over the interval in progress, up to _since, of each
+    #     line's length times how long it had that length.
+    # @type _since: list[int]
+    #     The time of each line's last change in the interval in progress,
+    #     or the start of the interval if none.
+
+    def __init__(self, interval, capacity):
+        """Initialize a SampleArchive which has not started.
+
+        @type self: SampleArchive
+        @type interval: int
+        @type capacity: int
+        @rtype: None
+        """
+        self.interval = interval
+        self.capacity = capacity
+        self.end = interval
+        self._count = 0
+        self._next = 0
+        self._starts = array('q', bytes(8 * capacity))
+        self._mins = array('i')
+        self._maxes = array('i')
+        self._means = array('d')
+        self._closed = bytearray()
+        self._low = []
+        self._high = []
+        self._area = []
+        self._since = []
+
+    def start(self, lengths):
+        """Allocate the ring buffer for lines of <lengths>, and start the
+        first interval at time 0.
+
+        @type self: SampleArchive
+        @type lengths: list[int]
+        @rtype: None
+        """
+        size = self.capacity * len(lengths)
+        self._mins = array('i', bytes(4 * size))
+        self._maxes = array('i', bytes(4 * size))
+        self._means = array('d', bytes(8 * size))
+        self._closed = bytearray(size)
+        self._low = list(lengths)
+        self._high = list(lengths)
+        self._area = [0] * len(lengths)
+        self._since = [0] * len(lengths)
+
+    def change(self, timestamp, which_line, old, new):
+        """Record that line <which_line> went from <old> to <new> customers
+        at time <timestamp>, in the interval in progress.
+
+        @type self: SampleArchive
+        @type timestamp: int
+        @type which_line: int
+        @type old: int
+        @type new: int
+        @rtype: None
+        """
+        self._area[which_line] += old * (timestamp - self._since[which_line])
+        self._since[which_line] = timestamp
+        if new < self._low[which_line]:
+            self._low[which_line] = new
+        elif new > self._high[which_line]:
+            self._high[which_line] = new
+
+    def advance(self, timestamp, lengths, closed):
+        """Complete every interval which ends by time <timestamp>, given
+        the current <lengths> of the lines and whether each is <closed>.
+
+        @type self: SampleArchive
+        @type timestamp: int
+        @type lengths: list[int]
+        @type closed: list[bool]
+        @rtype: None
+        """
+        while timestamp >= self.end:
+            self._complete(lengths, closed)
+            # After a long quiet spell, every slot would be filled with the
+            # same values; skip the intervals which would be overwritten.
+            behind = (timestamp - self.end) // self.interval - self.capacity
+            if behind > 0:
+                for i in range(len(lengths)):
+                    self._since[i] += behind * self.interval
+                self.end += behind * self.interval
+
+    def _complete(self, lengths, closed):
+        """Write the interval in progress into the ring, and start the next
+        one.
+
+        @type self: SampleArchive
+        @type lengths: list[int]
+        @type closed: list[bool]
+        @rtype: None
+        """
+        end = self.end
+        base = self._next * len(lengths)
+        for i, length in enumerate(lengths):
+            area = self._area[i] + length * (end - self._since[i])
+            self._mins[base + i] = self._low[i]
+            self._maxes[base + i] = self._high[i]
+            self._means[base + i] = area / self.interval
+            self._closed[base + i] = closed[i]
+            self._low[i] = self._high[i] = length
+            self._area[i] = 0
+            self._since[i] = end
+        self._starts[self._next] = end - self.interval
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.end = end + self.interval
+
+    def series(self):
+        """Return the completed intervals, oldest first, as described in
+        QueueSampler.series.
+
+        @type self: SampleArchive
+        @rtype: dict[str, object]
+        """
+        slots = [(self._next - self._count + k) % self.capacity
+                 for k in range(self._count)]
+        line_count = len(self._low)
+        lines = []
+        for i in range(line_count):
+            indexes = [slot * line_count + i for slot in slots]
+            lines.append({
+                'min': [self._mins[index] for index in indexes],
+                'max': [self._maxes[index] for index in indexes],
+                'mean': [self._means[index] for index in indexes],
+                'closed': [bool(self._closed[index]) for index in indexes]})
+        return {'interval': self.interval,
+                'start': [self._starts[slot] for slot in slots],
+                'lines': lines}
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,342 @@
+"""A live-ingest service for the grocery store simulation.
+
+This file runs a GroceryStoreSimulation inside an asyncio server. Any
+number of producers connect to the ingest endpoint and send events as
+lines of text, in the same format as an event file. Each connection to the
+stats endpoint is sent the current stats as one line of JSON.
+
+Producers may interleave their events, so the simulation only performs
+events timestamped more than <lateness> seconds before the latest timestamp
+received. Events that arrive after the simulation has already passed
+their time are counted as late and dropped, and lines which are not valid
+events, which close a line the store does not have, or which are too long,
+are counted as bad and dropped.
+
+Data is read in large chunks, and each chunk's events are submitted and
+performed together. Chunks wait in a bounded queue to be simulated; when
+it is full, the server stops reading from producers until it has room.
+
+Usage:
+    python server.py config.json --ingest 127.0.0.1:9000 \
+        --stats unix:/tmp/store-stats.sock [--lateness 5]
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from event import CloseLine, parse_event_line
+from simulation import GroceryStoreSimulation
+from store import load_config
+
+_log = logging.getLogger(__name__)
+
+# How many bytes to read from a producer at a time.
+_CHUNK_SIZE = 65536
+# The longest line to keep waiting for the end of. Longer lines cannot be
+# events, so they are counted as bad and dropped as they are read.
+_MAX_LINE_SIZE = 4096
+# How many chunks of events may wait to be simulated before producers are
+# made to wait.
+_QUEUE_SIZE = 16
+
+
+class SimulationServer:
+    """A GroceryStoreSimulation fed by producers over sockets.
+
+    === Public attributes ===
+    @type simulation: GroceryStoreSimulation
+        The simulation being run.
+    @type lateness: int
+        How many seconds behind the latest timestamp received to keep the
+        simulation, so that events from slower producers are not late.
+    @type received: int
+        The number of events received.
+    @type late: int
+        The number of events dropped for arriving too late.
+    @type bad_lines: int
+        The number of lines which were not valid events.
+    """
+    # === Private Attributes ===
+    # @type _chunks: asyncio.Queue | None
+    #     Lists of events waiting to be simulated, once started.
+    # @type _worker: asyncio.Future | None
+    #     The task simulating the chunks, once started.
+    # @type _latest: int | None
+    #     The latest timestamp received so far, if any.
+    # @type _queue_size: int
+    #     The most chunks _chunks may hold.
+    # @type _line_count: int
+    #     The number of lines in the store.
+
+    def __init__(self, store_file, lateness=0, queue_size=_QUEUE_SIZE):
+        """Initialize a SimulationServer which has not yet started.
+
+        @type self: SimulationServer
+        @type store_file: str | dict[str, object]
+            The configuration of the grocery store.
+        @type lateness: int
+        @type queue_size: int
+        @rtype: None
+        """
+        self.simulation = GroceryStoreSimulation(store_file)
+        config = load_config(store_file)
+        self._line_count = (config['cashier_count'] +
+                            config['express_count'] +
+                            config['self_serve_count'])
+        self.lateness = lateness
+        self.received = 0
+        self.late = 0
+        self.bad_lines = 0
+        self._chunks = None
+        self._worker = None
+        self._latest = None
+        self._queue_size = queue_size
+
+    async def start(self, ingest_address, stats_address):
+        """Start listening for producers at <ingest_address> and for stats
+        requests at <stats_address>, and return the two servers.
+
+        Addresses are 'host:port' for TCP, or 'unix:path' for a Unix
+        socket. Port 0 picks any free port.
+
+        @type self: SimulationServer
+        @type ingest_address: str
+        @type stats_address: str
+        @rtype: (asyncio.AbstractServer, asyncio.AbstractServer)
+
+        >>> async def demo():
+        ...     server = SimulationServer('config.json')
+        ...     ingest, stats = await server.start('127.0.0.1:0',
+        ...                                        '127.0.0.1:0')
+        ...     reader, writer = await asyncio.open_connection(
+        ...         *ingest.sockets[0].getsockname())
+        ...     writer.write(b'0 Arrive Jack 3\\n5 Arrive Jill 1\\n')
+        ...     writer.write(b'100 Arr')
+        ...     writer.write(b'ive Fred 2\\n')
+        ...     writer.write_eof()
+        ...     # The server closes the connection once it has read it all.
+        ...     await reader.read()
+        ...     writer.close()
+        ...     await server.drain()
+        ...     reader, _ = await asyncio.open_connection(
+        ...         *stats.sockets[0].getsockname())
+        ...     result = json.loads((await reader.readline()).decode())
+        ...     ingest.close()
+        ...     stats.close()
+        ...     return result
+        >>> result = asyncio.run(demo())
+        >>> result['received'], result['num_customers'], result['total_time']
+        (3, 2, 10)
+        """
+        self._chunks = asyncio.Queue(self._queue_size)
+        self._worker = asyncio.ensure_future(self._simulate())
+        ingest = await _start_server(self._handle_ingest, ingest_address)
+        stats = await _start_server(self._handle_stats, stats_address)
+        return ingest, stats
+
+    def process(self, events):
+        """Submit <events> to the simulation and advance it as far as it
+        can safely go.
+
+        @type self: SimulationServer
+        @type events: list[Event]
+        @rtype: None
+
+        >>> from event import NewArrive
+        >>> server = SimulationServer('config.json', lateness=10)
+        >>> server.process([NewArrive(0, 'Jack', 3), NewArrive(30, 'Jill', 1)])
+        >>> server.simulation.current_stats()['num_customers']
+        1
+        >>> server.process([NewArrive(15, 'Fred', 1)])
+        >>> server.late
+        1
+        """
+        simulation = self.simulation
+        latest = self._latest
+        for event in events:
+            try:
+                simulation.submit(event)
+            except ValueError:
+                self.late += 1
+                continue
+            if latest is None or event.timestamp > latest:
+                latest = event.timestamp
+        self.received += len(events)
+        self._latest = latest
+        if latest is not None:
+            # More events may yet arrive at the latest timestamp itself, so
+            # stop just short of it.
+            simulation.advance_to(latest - self.lateness - 1)
+
+    async def drain(self):
+        """Wait until every chunk of events read so far has been
+        simulated.
+
+        @type self: SimulationServer
+        @rtype: None
+        """
+        await self._chunks.join()
+
+    def stats(self):
+        """Return the current stats of the simulation, with counts of the
+        events received, late and malformed.
+
+        @type self: SimulationServer
+        @rtype: dict[str, object]
+
+        >>> SimulationServer('config.json').stats()['received']
+        0
+        """
+        # The simulation only starts once the first event is submitted.
+        stats = self.simulation.current_stats() if self.received > 0 else {}
+        stats['received'] = self.received
+        stats['late'] = self.late
+        stats['bad_lines'] = self.bad_lines
+        return stats
+
+    async def _simulate(self):
+        """Simulate chunks of events from _chunks as they arrive, forever.
+
+        A chunk which fails to simulate is logged, and the next chunk is
+        simulated as usual, so that producers are not left waiting on a
+        full queue. Only the event which failed is lost: the rest of the
+        chunk was already submitted, and is performed when the next chunk
+        advances the simulation.
+
+        @type self: SimulationServer
+        @rtype: None
+        """
+        while True:
+            events = await self._chunks.get()
+            try:
+                self.process(events)
+            except Exception:
+                _log.exception('Failed to simulate a chunk of %d events',
+                               len(events))
+            finally:
+                self._chunks.task_done()
+
+    async def _handle_ingest(self, reader, writer):
+        """Read events from one producer until it disconnects.
+
+        @type self: SimulationServer
+        @type reader: asyncio.StreamReader
+        @type writer: asyncio.StreamWriter
+        @rtype: None
+        """
+        partial = b''
+        # Whether the rest of an overlong line is still to be skipped.
+        skipping = False
+        while True:
+            data = await reader.read(_CHUNK_SIZE)
+            if not data:
+                break
+            if skipping:
+                end = data.find(b'\n')
+                if end < 0:
+                    continue
+                data = data[end + 1:]
+                skipping = False
+            # The last line may be cut short; keep it for the next chunk.
+            complete, _, partial = (partial + data).rpartition(b'\n')
+            if len(partial) > _MAX_LINE_SIZE:
+                self.bad_lines += 1
+                partial = b''
+                skipping = True
+            # This waits while the queue is full, so the producer is not
+            # read from until the simulation catches up.
+            await self._chunks.put(self._parse(complete))
+        if partial:
+            await self._chunks.put(self._parse(partial))
+        writer.close()
+
+    async def _handle_stats(self, reader, writer):
+        """Send the current stats to one client as a line of JSON.
+
+        @type self: SimulationServer
+        @type reader: asyncio.StreamReader
+        @type writer: asyncio.StreamWriter
+        @rtype: None
+        """
+        writer.write(json.dumps(self.stats()).encode() + b'\n')
+        await writer.drain()
+        writer.close()
+
+    def _parse(self, data):
+        """Return the events on the lines of <data>, counting any bad lines.
+
+        @type self: SimulationServer
+        @type data: bytes
+        @rtype: list[Event]
+
+        >>> server = SimulationServer('config.json')
+        >>> data = b'0 Arrive Jack 3\\n\\nnonsense\\n5 Close 1\\n7 Close 99'
+        >>> events = server._parse(data)
+        >>> len(events), server.bad_lines
+        (2, 2)
+        """
+        events = []
+        for line in data.decode('utf-8', 'replace').split('\n'):
+            try:
+                event = parse_event_line(line)
+            except ValueError:
+                self.bad_lines += 1
+                continue
+            if event is None:
+                if line.strip():
+                    self.bad_lines += 1
+            elif (type(event) is CloseLine and
+                    not 0 <= event.which_line < self._line_count):
+                self.bad_lines += 1
+            else:
+                events.append(event)
+        return events
+
+
+async def _start_server(handler, address):
+    """Start an asyncio server for <handler> listening at <address>.
+
+    @type handler: callable
+    @type address: str
+        'host:port' for TCP, or 'unix:path' for a Unix socket.
+    @rtype: asyncio.AbstractServer
+    """
+    if address.startswith('unix:'):
+        return await asyncio.start_unix_server(handler,
+                                               address[len('unix:'):])
+    host, _, port = address.rpartition(':')
+    return await asyncio.start_server(handler, host or None, int(port))
+
+
+async def _serve(store_file, ingest_address, stats_address, lateness):
+    """Run a SimulationServer until interrupted.
+
+    @type store_file: str
+    @type ingest_address: str
+    @type stats_address: str
+    @type lateness: int
+    @rtype: None
+    """
+    server = SimulationServer(store_file, lateness)
+    ingest, stats = await server.start(ingest_address, stats_address)
+    async with ingest, stats:
+        await asyncio.gather(ingest.serve_forever(), stats.serve_forever())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run the grocery store simulation on live events.')
+    parser.add_argument('config', help='the store configuration file')
+    parser.add_argument('--ingest', default='127.0.0.1:9000',
+                        help='where producers send events: HOST:PORT or '
+                             'unix:PATH')
+    parser.add_argument('--stats', default='127.0.0.1:9001',
+                        help='where to serve the stats: HOST:PORT or '
+                             'unix:PATH')
+    parser.add_argument('--lateness', type=int, default=0,
+                        help='seconds to wait for events from slower '
+                             'producers')
+    args = parser.parse_args()
+
+    asyncio.run(_serve(args.config, args.ingest, args.stats, args.lateness))
@@ -5,9 +5,33 @@ kinds of events in the simulation.
 """
 # Feel free to add extra imports here for your own modules.
 # Just don't import any external libraries!
-from container import PriorityQueue
-from store import GroceryStore
-from event import Event, create_event_list
+import os
+import pickle
+import zlib
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from container import PriorityQueue, CalendarQueue
+from store import GroceryStore, load_config
+from event import Rejoin, create_event_list, iter_events, do_batch
+from profiler import EventProfiler, TimedContainer
+from fast_path import single_line_kind, read_arrivals, simulate
+import compact
+
+# The event queue implementations that can be selected with the
+# 'event_queue' configuration setting. Both order events by timestamp,
+# breaking ties in the order the events were added.
+_EVENT_QUEUES = {
+    # Events are ordered by timestamp alone, so compare the timestamps
+    # directly rather than going through Event's comparison methods.
+    'priority': lambda: PriorityQueue(key=attrgetter('timestamp')),
+    'calendar': CalendarQueue
+}
+
+# The first bytes of a snapshot file written by save_snapshot.
+_SNAPSHOT_MAGIC = b'GSS1'
+# How many events are performed between snapshots if no interval is given.
+_DEFAULT_SNAPSHOT_EVENTS = 100000
 
 
 class GroceryStoreSimulation:
@@ -25,73 +49,743 @@ class GroceryStoreSimulation:
     This is the entry point into your program, and in particular is used for
     autotesting purposes. This makes it ESSENTIAL that you do not change the
     interface in any way!
+
+    === Optional configuration settings ===
+    Besides the store layout, the configuration file may contain:
+    'event_queue': 'priority' | 'calendar'
+        The event queue to use (default 'priority'). 'calendar' buckets
+        events by timestamp, which is faster when timestamps are dense.
+    'streaming': bool
+        If true, read the event file lazily instead of loading it all into
+        the event queue up front (default false). Memory then depends on
+        the number of events in flight rather than the size of the file,
+        but the file's events must be in non-decreasing timestamp order.
+    'wait_quantiles': bool
+        If true, also report 'mean_wait', estimated 'wait_p50', 'wait_p95'
+        and 'wait_p99', and per line type customer counts, throughput and
+        wait quantiles under 'line_types' (default false). These are kept
+        in constant memory; see quantiles.WaitDistribution.
+    'profile': bool
+        If true, also report a 'profile' entry (default false). Its
+        'events' entry gives the count, total seconds and max seconds of
+        do() for each kind of event, and its 'queue' entry gives the
+        number of adds and removes, the total seconds spent in them, and
+        the most events the queue held at once. Its 'customers' entry
+        gives the memory used by the store's Customers; see
+        store.CustomerIndex.memory_summary.
+    'batch': bool
+        If true, perform all the events with the same timestamp together
+        (default false); see event.do_batch. The stats are the same either
+        way. When profiling, each batch is timed as one 'Batch' event.
+    'snapshot_file': str
+        If given, save a snapshot of the running simulation to this file
+        every so often; see save_snapshot. The simulation can then be
+        carried on from the latest snapshot with load_snapshot and resume.
+    'snapshot_interval_events': int
+        Save a snapshot after this many events have been performed since
+        the last one.
+    'snapshot_interval_time': int
+        Save a snapshot once the simulation time has moved on this many
+        seconds since the last one. If neither interval is given, a
+        snapshot is saved every 100000 events.
+    'customer_table': bool
+        If true, keep the store's Customers in one array per attribute
+        rather than as one object each (default false); see
+        store.CustomerColumns. This uses less memory per Customer when many
+        are in the store at once, at some cost in speed.
+    'engine': 'event' | 'compact' | 'auto' | 'fast'
+        How to run the simulation (default 'event'). 'compact' performs
+        events as plain tuples rather than Event objects; see compact.py.
+        It gives the same stats, and is not used with 'profile' or
+        'snapshot_file', nor by the live feed methods. 'fast' computes the
+        stats directly with fast_path instead of performing events one by
+        one, which only works for a store with a single line and an event
+        file with no Close events and no repeated names. 'auto' uses the
+        fast path when it can, and performs events otherwise. The fast
+        path leaves the store untouched and reports only the basic stats,
+        so it is never used with 'wait_quantiles', 'profile' or
+        'snapshot_file'.
+    'event_cache': bool | str
+        Whether to read text event files through the event file cache
+        (default true), or the cache directory to use; see
+        event.create_event_list.
     """
     # === Private Attributes ===
-    # @type _events: PriorityQueue[Event]
+    # @type _events: Container[Event]
     #     A sequence of events arranged in priority determined by the event
     #     sorting order.
     # @type _store: GroceryStore
     #     The grocery store associated with the simulation.
+    # @type _streaming: bool
+    #     Whether to read event files lazily.
+    # @type _batch: bool
+    #     Whether to perform events with the same timestamp together.
+    # @type _profiler: EventProfiler | None
+    #     Times each event, if profiling is on. _events is then wrapped in
+    #     a TimedContainer.
+    # @type _stats: dict[str, object] | None
+    #     The statistics of the simulation so far, once started.
+    # @type _clock: int
+    #     The time the simulation has been advanced to with advance_to, or
+    #     -1 if it has not been.
+    # @type _finished: bool
+    #     Whether the simulation has been run on an event file, after which
+    #     it takes no live events.
+    # @type _source: _EventSource | None
+    #     The events from the event file still to be merged into the event
+    #     queue, once run. Empty unless streaming.
+    # @type _snapshot_file: str | None
+    #     Where to save snapshots while running, if anywhere.
+    # @type _snapshot_events: int | None
+    #     How many events to perform between snapshots, if counting events.
+    # @type _snapshot_time: int | None
+    #     How many seconds of simulation time between snapshots, if any.
+    # @type _since_snapshot: int
+    #     How many events have been performed since the last snapshot.
+    # @type _next_snapshot_time: int | None
+    #     The simulation time at which the next snapshot is due, if any.
+    # @type _engine: str
+    #     The 'engine' setting.
+    # @type _event_cache: bool | str
+    #     The 'event_cache' setting.
+    # @type _fast_kind: type | None
+    #     The class of the store's only line, if the fast path may be used.
     def __init__(self, store_file):
         """Initialize a GroceryStoreSimulation from a file.
 
-        @type store_file: str
-            A file containing the configuration of the grocery store.
+        @type store_file: str | dict[str, object]
+            A file containing the configuration of the grocery store, or
+            the configuration itself.
         @rtype: None
         """
-        self._events = PriorityQueue()
+        config = load_config(store_file)
+        event_queue = config.get('event_queue', 'priority')
+        if event_queue not in _EVENT_QUEUES:
+            raise ValueError('Unknown event_queue: {}'.format(event_queue))
+        self._events = _EVENT_QUEUES[event_queue]()
         self._store = GroceryStore(store_file)
+        self._streaming = config.get('streaming', False)
+        self._batch = config.get('batch', False)
+        if config.get('profile', False):
+            self._events = TimedContainer(self._events)
+            self._profiler = EventProfiler()
+        else:
+            self._profiler = None
+        self._stats = None
+        self._source = None
+        self._clock = -1
+        self._finished = False
+        self._snapshot_file = config.get('snapshot_file')
+        self._snapshot_events = config.get('snapshot_interval_events')
+        self._snapshot_time = config.get('snapshot_interval_time')
+        if self._snapshot_events is None and self._snapshot_time is None:
+            self._snapshot_events = _DEFAULT_SNAPSHOT_EVENTS
+        self._since_snapshot = 0
+        self._next_snapshot_time = None
 
-    def run(self, event_file):
+        self._engine = config.get('engine', 'event')
+        self._event_cache = config.get('event_cache', True)
+        if self._engine not in ('event', 'compact', 'auto', 'fast'):
+            raise ValueError('Unknown engine: {}'.format(self._engine))
+        if self._engine == 'compact' and (
+                self._profiler is not None or self._snapshot_file is not None):
+            raise ValueError('The compact engine cannot be used with the '
+                             'profile or snapshot_file settings')
+        self._fast_kind = None
+        if self._engine in ('auto', 'fast') and not (
+                config.get('wait_quantiles', False) or
+                config.get('profile', False) or
+                self._snapshot_file is not None):
+            self._fast_kind = single_line_kind(config)
+        if self._engine == 'fast' and self._fast_kind is None:
+            raise ValueError('The fast engine needs a store with one line, '
+                             'and no wait_quantiles, profile or '
+                             'snapshot_file settings')
+
+    def run(self, event_file, trace=None, sampler=None):
         """Run the simulation on the events stored in <event_file>.
 
         Return a dictionary containing statistics of the simulation,
         according to the specifications in the assignment handout.
 
+        If <trace> is given, each customer's row is recorded in it as they
+        finish checking out; see tracing.py. It is flushed at the end, but
+        left open. A trace cannot be kept with the fast engine or while
+        saving snapshots.
+
+        If <sampler> is given, it is attached to the store's lines and
+        told of every change to them, and advanced to the end of the
+        simulation; see sampler.py. It cannot be used with the fast
+        engine.
+
+        Once run, the simulation takes no live events with submit or
+        advance_to.
+
         @type self: GroceryStoreSimulation
-        @type event_file: str
-            A filename referring to a raw list of events.
+        @type event_file: str | list[Event]
+            A filename referring to a raw list of events, or a list of
+            events already read with create_event_list. Events are not
+            changed by running them, so one list can be reused across
+            simulations.
             Precondition: the event file is a valid list of events.
+        @type trace: TraceSink | None
+        @type sampler: QueueSampler | None
         @rtype: dict[str, object]
+
+        >>> from event import NewArrive
+        >>> config = {'cashier_count': 1, 'express_count': 0,
+        ...           'self_serve_count': 0, 'line_capacity': 2}
+        >>> events = [NewArrive(t, 'c' + str(t), t % 9 + 1)
+        ...           for t in range(0, 200, 3)]
+        >>> GroceryStoreSimulation(config).run(events) == \\
+        ...     GroceryStoreSimulation(dict(config, engine='fast')).run(events)
+        True
+        """
+        if trace is not None:
+            if self._engine == 'fast' or self._snapshot_file is not None:
+                raise ValueError('A trace cannot be kept with the fast '
+                                 'engine or the snapshot_file setting')
+            self._store.trace = trace
+        if sampler is not None:
+            if self._engine == 'fast':
+                raise ValueError('A sampler cannot be used with the fast '
+                                 'engine')
+            sampler.attach(self._store.check_out_lines)
+            self._store.sampler = sampler
+        if self._fast_kind is not None and trace is None and sampler is None:
+            arrivals = read_arrivals(event_file)
+            if arrivals is not None:
+                self._finished = True
+                return simulate(self._fast_kind, *arrivals)
+            if self._engine == 'fast':
+                raise ValueError('The fast engine cannot simulate an event '
+                                 'file with Close events, repeated names or '
+                                 'events out of order')
+
+        self._start()
+        if self._engine == 'compact':
+            stats = self._run_compact(event_file)
+        else:
+            if self._streaming:
+                self._source = _EventSource(event_file)
+            else:
+                if isinstance(event_file, str):
+                    event_file = create_event_list(event_file,
+                                                   self._event_cache)
+                for event in event_file:
+                    self._events.add(event)
+            stats = self.resume()
+
+        self._finished = True
+        if trace is not None:
+            trace.flush()
+        if sampler is not None:
+            sampler.advance(stats['total_time'])
+        return stats
+
+    def resume(self, event_file=None):
+        """Continue the simulation from where it stopped, and return the
+        statistics of the whole simulation, as run does.
+
+        This is how a simulation read with load_snapshot is finished.
+
+        @type self: GroceryStoreSimulation
+        @type event_file: list[Event] | None
+            When streaming from a list of events rather than a file, the
+            same list that was passed to run. Events already read from it
+            are skipped. A file is reopened by name.
+        @rtype: dict[str, object]
+
+        >>> import json, os, tempfile
+        >>> handle, filename = tempfile.mkstemp()
+        >>> os.close(handle)
+        >>> with open('config.json') as file:
+        ...     config = json.load(file)
+        >>> config['snapshot_file'] = filename
+        >>> config['snapshot_interval_time'] = 50
+        >>> config['event_cache'] = False
+        >>> stats = GroceryStoreSimulation(config).run('events.txt')
+        >>> sim = GroceryStoreSimulation.load_snapshot(filename)
+        >>> sim.resume() == stats
+        True
+        >>> os.remove(filename)
+        >>> GroceryStoreSimulation(config).resume()
+        Traceback (most recent call last):
+        ...
+        ValueError: The simulation has not started
+        """
+        self._check_started()
+        self._source.reopen(event_file)
+        self._perform()
+        return self.current_stats()
+
+    def submit(self, event):
+        """Add <event>, just received from a live feed, to the simulation.
+
+        Nothing is performed until advance_to reaches the event's time.
+        Events may be submitted in any order, as long as each is after
+        the time the simulation has already advanced to: the events at
+        that time have been performed, so one more could not come before
+        the events they spawned. Like events from an event file, they come
+        before any spawned events with the same timestamp.
+
+        @type self: GroceryStoreSimulation
+        @type event: Event
+        @rtype: None
+
+        >>> from event import NewArrive
+        >>> sim = GroceryStoreSimulation('config.json')
+        >>> sim.submit(NewArrive(5, 'Jack', 3))
+        >>> sim.advance_to(20)
+        >>> sim.current_stats()
+        {'num_customers': 1, 'total_time': 15, 'max_wait': 10}
+        >>> sim.submit(NewArrive(20, 'Jill', 1))
+        Traceback (most recent call last):
+        ...
+        ValueError: Event at time 20 is not after the simulation time 20
+        >>> sim = GroceryStoreSimulation('config.json')
+        >>> sim.run([NewArrive(5, 'Jack', 3)])['total_time']
+        15
+        >>> sim.submit(NewArrive(1, 'Jill', 1))
+        Traceback (most recent call last):
+        ...
+        ValueError: The simulation has already been run on an event file
+        """
+        self._check_live()
+        if self._stats is None:
+            self._start()
+        if event.timestamp <= self._clock:
+            raise ValueError('Event at time {} is not after the simulation '
+                             'time {}'.format(event.timestamp, self._clock))
+        self._source.submit(event)
+
+    def advance_to(self, timestamp):
+        """Perform every event up to and including time <timestamp>.
+
+        Only the events that have come due since the last call are
+        performed, so the work done is proportional to them rather than
+        to the whole simulation so far.
+
+        @type self: GroceryStoreSimulation
+        @type timestamp: int
+        @rtype: None
+        """
+        self._check_live()
+        if self._stats is None:
+            self._start()
+        self._source.reopen()
+        self._perform(timestamp)
+        if timestamp > self._clock:
+            self._clock = timestamp
+
+    def current_stats(self):
+        """Return the statistics of the simulation so far, as run does.
+
+        @type self: GroceryStoreSimulation
+        @rtype: dict[str, object]
+
+        >>> GroceryStoreSimulation('config.json').current_stats()
+        Traceback (most recent call last):
+        ...
+        ValueError: The simulation has not started
+        """
+        self._check_started()
+        # The store keeps running totals over the Customers who have
+        # checked out, so there is nothing left to scan here.
+        stats = dict(self._stats)
+        stats['num_customers'] = self._store.statistics.num_customers
+        stats['max_wait'] = self._store.statistics.max_wait
+        if self._store.wait_distribution is not None:
+            stats['mean_wait'] = self._store.statistics.mean_wait()
+            stats.update(
+                self._store.wait_distribution.summary(stats['total_time']))
+        if self._profiler is not None:
+            stats['profile'] = {
+                'events': self._profiler.summary(),
+                'queue': self._events.summary(),
+                'customers': self._store.customers.memory_summary()}
+        return stats
+
+    def _check_started(self):
+        """Raise ValueError if the simulation has not yet started, by
+        being run, fed a live event or loaded from a snapshot.
+
+        @type self: GroceryStoreSimulation
+        @rtype: None
+        """
+        if self._stats is None:
+            raise ValueError('The simulation has not started')
+
+    def _check_live(self):
+        """Raise ValueError if the simulation can no longer take live
+        events, because it has already been run.
+
+        @type self: GroceryStoreSimulation
+        @rtype: None
+        """
+        if self._finished:
+            raise ValueError('The simulation has already been run on an '
+                             'event file')
+
+    def _start(self):
+        """Reset the statistics and the event source, ready to run.
+
+        @type self: GroceryStoreSimulation
+        @rtype: None
         """
         # Initialize statistics
-        stats = {
+        self._stats = {
             'num_customers': 0,
             'total_time': 0,
             'max_wait': -1
         }
+        self._source = _EventSource([])
+        self._clock = -1
+        self._next_snapshot_time = self._snapshot_time
 
-        initial_events = create_event_list(event_file)
+    def _run_compact(self, event_file):
+        """Run the simulation on <event_file> with the compact engine, and
+        return the statistics, as run does.
 
-        # TODO: Process all of the events, collecting statistics along the way.
+        @type self: GroceryStoreSimulation
+        @type event_file: str | list[Event]
+        @rtype: dict[str, object]
 
-        for event in initial_events:
-            self._events.add(event)
+        >>> config = {'cashier_count': 1, 'express_count': 1,
+        ...           'self_serve_count': 1, 'line_capacity': 10,
+        ...           'event_cache': False}
+        >>> GroceryStoreSimulation(dict(config, engine='compact')).run(
+        ...     'events.txt') == GroceryStoreSimulation(config).run(
+        ...     'events.txt')
+        True
+        """
+        events = event_file
+        if isinstance(event_file, str):
+            events = iter_events(event_file) if self._streaming \
+                else create_event_list(event_file, self._event_cache)
+        records = map(compact.compile_event, events)
+        if not self._streaming:
+            # The same order the event queue would give: by timestamp, and
+            # in file order on ties.
+            records = sorted(records, key=itemgetter(0))
+        self._stats['total_time'] = compact.perform(self._store, records)
+        return self.current_stats()
 
-        while not self._events.is_empty():
-            current_event = self._events.remove()
-            new_events = current_event.do(self._store)
-            stats['total_time'] = current_event.timestamp
-            # collects the total time
+    def _perform(self, until=None):
+        """Perform the events in order, up to and including time <until>.
 
-            if new_events is None:
-                pass
-            elif len(new_events) > 0:
+        @type self: GroceryStoreSimulation
+        @type until: int | None
+            The last time to perform events at; None to perform them all.
+        @rtype: None
+        """
+        if self._batch:
+            for batch in self._merge_batches(until):
+                if self._profiler is None:
+                    new_events = do_batch(batch, self._store)
+                else:
+                    new_events = self._profiler.do_batch(batch, self._store)
+                self._stats['total_time'] = batch[0].timestamp
                 for x in new_events:
-                    self._events.add(x)
+                    if type(x) is Rejoin:
+                        x.add_to(self._events)
+                    else:
+                        self._events.add(x)
+                if self._snapshot_file is not None:
+                    self._count_toward_snapshot(len(batch))
+        else:
+            for current_event in self._merge(until):
+                if self._profiler is None:
+                    new_events = current_event.do(self._store)
+                else:
+                    new_events = self._profiler.do(current_event, self._store)
+                self._stats['total_time'] = current_event.timestamp
+                # collects the total time
 
-        # find out how many Customers have checked out
-        #   through store's finished_customers dict
-        stats['num_customers'] = len(self._store.finished_customers)
+                if new_events is None:
+                    pass
+                elif len(new_events) > 0:
+                    for x in new_events:
+                        if type(x) is Rejoin:
+                            x.add_to(self._events)
+                        else:
+                            self._events.add(x)
+                if self._snapshot_file is not None:
+                    self._count_toward_snapshot(1)
 
-        # find out max_wait from store's finished_customers
-        for customer in self._store.finished_customers:
-            if self._store.finished_customers[customer].get_wait_time() > \
-                    stats['max_wait']:
-                stats['max_wait'] = self._store.finished_customers[
-                    customer].get_wait_time()
+    def save_snapshot(self, filename):
+        """Save the state of this simulation to <filename>.
+
+        The snapshot holds the event queue, the store with its lines and
+        customers, and the statistics so far. A simulation which is
+        streaming its events records how many it has read, rather than
+        the events themselves.
+
+        @type self: GroceryStoreSimulation
+        @type filename: str
+        @rtype: None
+        """
+        data = _SNAPSHOT_MAGIC + zlib.compress(
+            pickle.dumps(self, pickle.HIGHEST_PROTOCOL))
+        # Write to a temporary file first, so that a crash part way through
+        # never leaves a broken snapshot behind.
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load_snapshot(cls, filename):
+        """Return the simulation saved to <filename> by save_snapshot.
+
+        Call resume on it to carry on running it. Each load gives an
+        independent simulation, so one snapshot can be resumed several
+        times, e.g. under different what-if events.
+
+        @type filename: str
+        @rtype: GroceryStoreSimulation
+        """
+        with open(filename, 'rb') as file:
+            data = file.read()
+        if not data.startswith(_SNAPSHOT_MAGIC):
+            raise ValueError('Not a simulation snapshot: {}'.format(filename))
+        return pickle.loads(zlib.decompress(data[len(_SNAPSHOT_MAGIC):]))
+
+    def _count_toward_snapshot(self, performed):
+        """Record that <performed> more events were performed, and save a
+        snapshot to the configured file if one is due.
+
+        @type self: GroceryStoreSimulation
+        @type performed: int
+        @rtype: None
+        """
+        self._since_snapshot += performed
+        if (self._snapshot_events is not None and
+                self._since_snapshot >= self._snapshot_events) or \
+                (self._next_snapshot_time is not None and
+                 self._stats['total_time'] >= self._next_snapshot_time):
+            self._since_snapshot = 0
+            if self._next_snapshot_time is not None:
+                self._next_snapshot_time = \
+                    self._stats['total_time'] + self._snapshot_time
+            self.save_snapshot(self._snapshot_file)
+
+    def _merge(self, until=None):
+        """Yield events from the event source and the event queue in order,
+        up to and including time <until> (or all of them, if None).
+
+        Each event is yielded before it is performed, so events spawned by
+        it may be added to the queue before the next one is chosen. On a
+        timestamp tie the file event comes first, just as if every file
+        event had been added to the queue before the simulation started.
+
+        @type self: GroceryStoreSimulation
+        @type until: int | None
+        @rtype: iterator[Event]
+        """
+        source = self._source
+        while True:
+            pending = source.peek()
+            if pending is not None and (
+                    self._events.is_empty() or
+                    pending.timestamp <= self._events.peek().timestamp):
+                if until is not None and pending.timestamp > until:
+                    return
+                yield source.pop()
+            elif not self._events.is_empty():
+                if until is not None and \
+                        self._events.peek().timestamp > until:
+                    return
+                yield self._events.remove()
+            else:
+                return
+
+    def _merge_batches(self, until=None):
+        """Yield lists of events from the event source and the event queue.
+
+        Like _merge, but yields every event with the next timestamp at
+        once, in the order _merge would have yielded them. Events that the
+        batch spawns with that same timestamp go into the next batch.
+
+        @type self: GroceryStoreSimulation
+        @type until: int | None
+        @rtype: iterator[list[Event]]
+        """
+        source = self._source
+        while source.peek() is not None or not self._events.is_empty():
+            pending = source.peek()
+            if pending is not None and (
+                    self._events.is_empty() or
+                    pending.timestamp <= self._events.peek().timestamp):
+                timestamp = pending.timestamp
+            else:
+                timestamp = self._events.peek().timestamp
+            if until is not None and timestamp > until:
+                return
+
+            batch = []
+            while source.peek() is not None and \
+                    source.peek().timestamp == timestamp:
+                batch.append(source.pop())
+            if not self._events.is_empty() and \
+                    self._events.peek().timestamp == timestamp:
+                batch.extend(self._events.remove_batch())
+            yield batch
+
+
+class _EventSource:
+    """The events of an event file, read one at a time in timestamp order,
+    together with any events submitted from a live feed.
+
+    On a timestamp tie, events from the file come before submitted ones,
+    and submitted ones come in the order they were submitted.
+
+    An _EventSource can be pickled part way through: it then keeps only
+    how many events have been read from the file, and is reopened after
+    unpickling.
+
+    === Public attributes ===
+    @type consumed: int
+        The number of events popped from the file so far.
+    """
+    # === Private Attributes ===
+    # @type _filename: str | None
+    #     The event file being read, or None if reading a list of events.
+    # @type _events: iterator[Event] | None
+    #     The events not yet read, or None if not open.
+    # @type _next: Event | None
+    #     The next event from the file, read ahead of time; None once all
+    #     are read.
+    # @type _submitted: PriorityQueue[Event]
+    #     The submitted events not yet popped.
+    # @type _head: Event | None
+    #     The next event to pop, from the file or the submitted events.
+
+    def __init__(self, events):
+        """Initialize an _EventSource over <events>.
+
+        @type self: _EventSource
+        @type events: str | list[Event]
+            An event file, or the events themselves.
+        @rtype: None
+        """
+        self.consumed = 0
+        self._filename = events if isinstance(events, str) else None
+        self._events = None
+        self._next = None
+        self._submitted = PriorityQueue(key=attrgetter('timestamp'))
+        self._head = None
+        self.reopen(events if self._filename is None else None)
+
+    def reopen(self, events=None):
+        """Start reading again after unpickling, skipping the events that
+        were already popped. Do nothing if already open.
+
+        @type self: _EventSource
+        @type events: list[Event] | None
+            The events to read, if not reading from a file.
+        @rtype: None
+        """
+        if self._events is not None:
+            return
+        if self._filename is not None:
+            events = iter_events(self._filename)
+        elif events is None:
+            raise ValueError('Streaming from a list of events; '
+                             'pass the same list again to resume')
+        self._events = islice(events, self.consumed, None)
+        self._next = next(self._events, None)
+        self._choose_head()
+
+    def submit(self, event):
+        """Add <event> to the events to pop.
+
+        @type self: _EventSource
+        @type event: Event
+        @rtype: None
+
+        >>> from event import Event
+        >>> source = _EventSource([Event(1), Event(3)])
+        >>> source.submit(Event(3))
+        >>> source.submit(Event(2))
+        >>> [source.pop().timestamp for _ in range(4)]
+        [1, 2, 3, 3]
+        >>> source.peek() is None
+        True
+        """
+        self._submitted.add(event)
+        self._choose_head()
+
+    def peek(self):
+        """Return the next event without popping it, or None if all have
+        been popped.
+
+        @type self: _EventSource
+        @rtype: Event | None
+        """
+        return self._head
+
+    def pop(self):
+        """Remove and return the next event.
+
+        Precondition: peek() is not None.
+
+        @type self: _EventSource
+        @rtype: Event
+
+        >>> from event import Event
+        >>> source = _EventSource([Event(2), Event(1)])
+        >>> source.pop().timestamp
+        Traceback (most recent call last):
+        ...
+        ValueError: Event file is not in timestamp order at time 1
+        """
+        event = self._head
+        if event is self._next:
+            self._next = next(self._events, None)
+            self.consumed += 1
+            if self._next is not None and \
+                    self._next.timestamp < event.timestamp:
+                raise ValueError('Event file is not in timestamp order at '
+                                 'time {}'.format(self._next.timestamp))
+            if self._submitted.is_empty():
+                # Nothing submitted, as when simply reading a file.
+                self._head = self._next
+                return event
+        else:
+            self._submitted.remove()
+        self._choose_head()
+        return event
+
+    def _choose_head(self):
+        """Set _head to the earlier of the next file event and the next
+        submitted event.
+
+        @type self: _EventSource
+        @rtype: None
+        """
+        self._head = self._next
+        if not self._submitted.is_empty() and (
+                self._next is None or
+                self._submitted.peek().timestamp < self._next.timestamp):
+            self._head = self._submitted.peek()
+
+    def __getstate__(self):
+        """Return the state to pickle, leaving out the open iterator.
+
+        @type self: _EventSource
+        @rtype: dict[str, object]
+        """
+        state = dict(self.__dict__)
+        if self._next is None:
+            # The whole file has been read, so there is nothing to reopen.
+            state['_events'] = iter(())
+        else:
+            state['_events'] = None
+            state['_next'] = None
+            state['_head'] = None
+        return state
 
-        return stats
 
 # We have provided a bit of code to help test your work.
 if __name__ == '__main__':
@@ -0,0 +1,218 @@
+"""Benchmarks for GroceryStoreSimulation.run.
+
+Times the simulation across event counts, numbers of lines and line
+capacities, on synthetic workloads from workload.py. Each case runs in a
+fresh process so that its peak memory use can be measured on its own.
+
+Results can be saved as a JSON baseline, and later runs compared against
+it: the run fails if any case's throughput drops by more than the
+threshold.
+
+Usage:
+    python simulation_benchmark.py --save baseline.json
+    python simulation_benchmark.py --baseline baseline.json
+    python simulation_benchmark.py --counts 1000,10000000 --lines 3,300
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from event import create_event_list
+from simulation import GroceryStoreSimulation
+from workload import write_event_file
+
+try:
+    import resource
+except ImportError:
+    # Peak memory is only measured where the resource module exists.
+    resource = None
+
+
+def make_cases(counts, line_counts, capacities):
+    """Return a benchmark case for every combination of the arguments.
+
+    Lines are split evenly between cashier, express and self serve lines.
+
+    @type counts: list[int]
+    @type line_counts: list[int]
+    @type capacities: list[int]
+    @rtype: list[dict[str, object]]
+
+    >>> [case['name'] for case in make_cases([1000], [3, 30], [10])]
+    ['n=1000 lines=3 capacity=10', 'n=1000 lines=30 capacity=10']
+    """
+    cases = []
+    for count in counts:
+        for lines in line_counts:
+            for capacity in capacities:
+                cases.append({
+                    'name': 'n={} lines={} capacity={}'.format(
+                        count, lines, capacity),
+                    'count': count,
+                    'config': {
+                        'cashier_count': lines - 2 * (lines // 3),
+                        'express_count': lines // 3,
+                        'self_serve_count': lines // 3,
+                        'line_capacity': capacity
+                    }
+                })
+    return cases
+
+
+def run_case(case):
+    """Return the timing and memory use of simulating <case>.
+
+    The result has the number of events simulated, the seconds taken to
+    read the event file and run GroceryStoreSimulation on it, the events
+    simulated per second, and the peak resident memory of this process in
+    kilobytes (None where it cannot be measured).
+
+    @type case: dict[str, object]
+    @rtype: dict[str, object]
+    """
+    config = case['config']
+    lines = sum(config[key] for key in
+                ['cashier_count', 'express_count', 'self_serve_count'])
+    # Customers take about 12 seconds to check out, so this keeps the store
+    # busy without letting the lines grow forever. Every so often one of
+    # the lines (never the last) closes, to exercise close_line.
+    rate = 0.07 * lines
+    span = int(case['count'] / rate)
+    closes = [(t, (t // 1000) % (lines - 1)) for t in range(1000, span, 1000)
+              ] if lines > 1 else []
+
+    handle, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(handle)
+    try:
+        write_event_file(filename, case['count'], seed=148, rate=rate,
+                         closes=closes)
+        sim = GroceryStoreSimulation(config)
+        start = time.perf_counter()
+        # Read the file without the event file cache, so each run parses
+        # the text and leaves no copy of the temporary file behind.
+        sim.run(create_event_list(filename, cache=False))
+        seconds = time.perf_counter() - start
+    finally:
+        os.remove(filename)
+
+    num_events = case['count'] + len(closes)
+    return {
+        'events': num_events,
+        'seconds': seconds,
+        'events_per_sec': num_events / seconds if seconds > 0 else 0.0,
+        'peak_rss_kb': _peak_rss_kb()
+    }
+
+
+def _peak_rss_kb():
+    """Return the peak resident memory of this process in kilobytes.
+
+    @rtype: int | None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_benchmarks(cases):
+    """Return the results of run_case for each of <cases>, by case name.
+
+    Each case runs in its own freshly started process.
+
+    @type cases: list[dict[str, object]]
+    @rtype: dict[str, dict[str, object]]
+    """
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for case in cases:
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            results[case['name']] = pool.apply(run_case, (case,))
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """Return a message for each case that got slower than its baseline.
+
+    A case regresses if its events per second fell by more than
+    <threshold> (a fraction) compared to <baseline>. Cases missing from
+    either side are ignored.
+
+    @type results: dict[str, dict[str, object]]
+    @type baseline: dict[str, dict[str, object]]
+    @type threshold: float
+    @rtype: list[str]
+
+    >>> find_regressions({'a': {'events_per_sec': 70.0}},
+    ...                  {'a': {'events_per_sec': 100.0}}, 0.2)
+    ['a: 70 events/sec, baseline 100 (-30%)']
+    >>> find_regressions({'a': {'events_per_sec': 90.0}},
+    ...                  {'a': {'events_per_sec': 100.0}}, 0.2)
+    []
+    """
+    messages = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]['events_per_sec']
+        new = result['events_per_sec']
+        if new < old * (1 - threshold):
+            messages.append('{}: {:.0f} events/sec, baseline {:.0f} '
+                            '({:+.0%})'.format(name, new, old, new / old - 1))
+    return messages
+
+
+def _parse_ints(text):
+    """Return the comma-separated ints in <text>.
+
+    @type text: str
+    @rtype: list[int]
+
+    >>> _parse_ints('1000,10000')
+    [1000, 10000]
+    """
+    return [int(value) for value in text.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark GroceryStoreSimulation.run.')
+    parser.add_argument('--counts', type=_parse_ints,
+                        default=[10 ** 3, 10 ** 4, 10 ** 5],
+                        help='arrival counts to try (up to 10000000)')
+    parser.add_argument('--lines', type=_parse_ints, default=[3, 30, 300],
+                        help='numbers of check out lines to try')
+    parser.add_argument('--capacities', type=_parse_ints, default=[10],
+                        help='line capacities to try')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as a JSON baseline')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='fail if slower than the JSON baseline in FILE')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed fractional drop in events/sec')
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(
+        make_cases(args.counts, args.lines, args.capacities))
+    for case_name, case_result in benchmark_results.items():
+        print('{:<36} {:>10.3f}s {:>12.0f} events/sec {:>10} KB'.format(
+            case_name, case_result['seconds'],
+            case_result['events_per_sec'], case_result['peak_rss_kb']))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(benchmark_results, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = find_regressions(benchmark_results, json.load(file),
+                                           args.threshold)
+        for message in regressions:
+            print('REGRESSION ' + message)
+        if regressions:
+            sys.exit(1)
@@ -5,6 +5,11 @@ in a grocery store.
 """
 # This module is used to read in the data from a json configuration file.
 import json
+import sys
+from array import array
+from collections import deque
+
+from quantiles import WaitDistribution
 
 
 class GroceryStore:
@@ -18,34 +23,54 @@ class GroceryStore:
 
     === Public Attributes ===
     @type check_out_lines: LineList
-    @type waiting_customers: dict{str: Customer}
-    @type finished_customers: dict{str: Customer}
-        # Each Customer who has finished checking out will be added
-        to this list.
-    This list will be used to determine the max waiting time
+    @type customers: CustomerIndex
+        # Each Customer who is in the store, indexed by customer ID (see
+        customer_id). Entries go back to None once their Customer finishes
+        checking out. A CustomerColumns if the configuration sets
+        'customer_table' to true, and a CustomerTable otherwise.
+    @type statistics: CustomerStatistics
+        # Running totals over every Customer who has finished checking out,
+        used to determine the number of customers and the max waiting time.
+    @type wait_distribution: WaitDistribution | None
+        # Waiting time quantiles and per line type throughput, if the
+        configuration sets 'wait_quantiles' to true.
+    @type trace: TraceSink | None
+        # Where to record each Customer who finishes checking out, if
+        anywhere; see tracing.py.
+    @type sampler: QueueSampler | None
+        # What to tell whenever a Line changes, if anything; see
+        sampler.py.
 
     """
 
     def __init__(self, filename):
         """Initialize a GroceryStore from a configuration file <filename>.
 
-        @type filename: str
+        @type filename: str | dict[str, object]
             The name of the file containing the configuration for the
-            grocery store.
+            grocery store, or the configuration itself.
         @rtype: None
         """
-        with open(filename, 'r') as file:
-            config = json.load(file)
+        config = load_config(filename)
 
-            # <config> is now a dictionary with the keys 'cashier_count',
-            # 'express_count', 'self_serve_count', and 'line_capacity'.
+        # <config> is now a dictionary with the keys 'cashier_count',
+        # 'express_count', 'self_serve_count', and 'line_capacity'.
 
         self.check_out_lines = LineList(config["cashier_count"],
                                         config["express_count"],
                                         config["self_serve_count"],
                                         config["line_capacity"])
-        self.waiting_customers = {}
-        self.finished_customers = {}
+        if config.get('customer_table', False):
+            self.customers = CustomerColumns()
+        else:
+            self.customers = CustomerTable()
+        self.statistics = CustomerStatistics()
+        if config.get('wait_quantiles', False):
+            self.wait_distribution = WaitDistribution()
+        else:
+            self.wait_distribution = None
+        self.trace = None
+        self.sampler = None
 
     def new_customer(self, timestamp, name, items):
         """
@@ -64,15 +89,30 @@ class GroceryStore:
         >>> c.items
         5
         """
-        new = Customer(name, items)
-        new.start_waiting = timestamp
-        self.waiting_customers[new.name] = new
-        return new
+        return self.customers.new(self.customer_id(name), name, items,
+                                  timestamp)
+
+    def customer_id(self, name):
+        """
+        Returns the customer ID of <name>, giving it the next unused one if
+        it has not been seen before.
+        @type self: GroceryStore
+        @type name: str
+        @rtype: int
+
+        >>> store = GroceryStore('config.json')
+        >>> store.customer_id('Jack'), store.customer_id('Jill')
+        (0, 1)
+        >>> store.customer_id('Jack')
+        0
+        """
+        return self.customers.id_of(name)
 
     def assign_customer(self, customer):
         """
         Assign a Customer to a Line. Returns the number of the Line the Customer
          joined
+        If no Line can take them, they join the last Line.
         @type self: GroceryStore
         @type customer: Customer
         @rtype: int
@@ -81,15 +121,25 @@ class GroceryStore:
         >>> customer = Customer('Jack', 5)
         >>> store.assign_customer(customer)
         0
+        >>> store = GroceryStore({'cashier_count': 2, 'express_count': 0,
+        ...                       'self_serve_count': 0, 'line_capacity': 1})
+        >>> [store.assign_customer(Customer(name, 5))
+        ...  for name in ['Jack', 'Jill', 'Jim']]
+        [0, 1, 1]
         """
-        assigned_line = self.check_out_lines.assign_customer(customer)
+        assigned_line = self.check_out_lines.assign_customer(customer) % \
+            len(self.check_out_lines.lines)
         customer.which_line = assigned_line
         self.check_out_lines.lines[assigned_line].add_customer(customer)
+        self.check_out_lines.update_line(assigned_line)
         return assigned_line
 
     def new_join(self, timestamp, name, items):
         """
         Processes the NewArrive event. Return the number of the assigned Line.
+        Raises ValueError if a Customer named <name> is still in the
+        store, since their ID would then be in two Lines at once. (A
+        Customer displaced from a closed Line rejoins with rejoin instead.)
         @type self: GroceryStore
         @type name: str
         @type items: int
@@ -98,72 +148,252 @@ class GroceryStore:
         >>> store = GroceryStore('config.json')
         >>> store.new_join(0, 'Jack', 3)
         0
+        >>> store.new_join(2, 'Jack', 1)
+        Traceback (most recent call last):
+        ...
+        ValueError: Customer Jack arrived at time 2 while still in the store
         """
 
-        if name not in self.waiting_customers:
-            assigned_line = \
-                self.assign_customer(self.new_customer(timestamp, name, items))
-            return assigned_line
-        else:
-            assigned_line = self.assign_customer(self.waiting_customers[name])
-            return assigned_line
+        if self.customers[self.customer_id(name)] is not None:
+            raise _already_in_store(timestamp, name)
+        assigned_line = \
+            self.assign_customer(self.new_customer(timestamp, name, items))
+        if self.sampler is not None:
+            self.sampler.record(timestamp, assigned_line)
+        return assigned_line
+
+    def new_join_batch(self, timestamp, arrivals):
+        """
+        Processes several NewArrive events with the same timestamp, in
+        order. Returns the Customers who are first in their Line right
+        after joining it, and so begin checking out, in the order they
+        arrived. Raises ValueError as new_join does.
+        @type self: GroceryStore
+        @type timestamp: int
+        @type arrivals: list[(str, int)]
+            The name and number of items of each arriving Customer.
+        @rtype: list[Customer]
 
-    def begin_check_out(self, timestamp, name):
+        >>> store = GroceryStore('config.json')
+        >>> first = store.new_join_batch(0, [('Jack', 3), ('Jill', 2),
+        ...                                  ('Jim', 4), ('Joe', 1)])
+        >>> [customer.name for customer in first]
+        ['Jack', 'Jill', 'Jim']
+        """
+        # This does the same as calling new_join for each arrival, with the
+        # method lookups hoisted out of the loop.
+        check_out_lines = self.check_out_lines
+        lines = check_out_lines.lines
+        assign = check_out_lines.assign_customer
+        update_line = check_out_lines.update_line
+        customers = self.customers
+        customer_id = customers.id_of
+        first_in_line = []
+        for name, items in arrivals:
+            new_id = customer_id(name)
+            if customers[new_id] is not None:
+                raise _already_in_store(timestamp, name)
+            customer = customers.new(new_id, name, items, timestamp)
+            which_line = assign(customer) % len(lines)
+            customer.which_line = which_line
+            line = lines[which_line]
+            line.add_customer(customer)
+            update_line(which_line)
+            if self.sampler is not None:
+                self.sampler.record(timestamp, which_line)
+            if len(line.customers) == 1:
+                first_in_line.append(customer)
+        return first_in_line
+
+    def begin_check_out(self, timestamp, customer_id):
         """
         Processes the Begin event.
         Should return the time it took the current Customer to check out.
         @type self: GroceryStore
-        @type name: str
+        @type customer_id: int
         @rtype: int
+
+        >>> store = GroceryStore('config.json')
+        >>> store.new_join(0, 'Jack', 3)
+        0
+        >>> store.begin_check_out(0, store.customer_id('Jack'))
+        10
         """
-        customer = self.waiting_customers[name]
+        customer = self.customers[customer_id]
         line_number = customer.which_line
         line = self.check_out_lines.lines[line_number]
         check_out_time = line.get_check_out_time(customer)
         return check_out_time
 
-    def finish_check_out(self, timestamp, name):
+    def finish_check_out(self, timestamp, customer_id):
         """
         Processes the Finish event.
-        Should return the name of the next Customer in this Line.
+        The Customer is counted in <statistics> and then leaves the store.
+        Should return the next Customer in this Line, or None if there is
+        none.
         @type self: GroceryStore
         @type timestamp: int
-        @type name: str
-        @rtype: str
+        @type customer_id: int
+        @rtype: Customer | None
+
+        >>> store = GroceryStore('config.json')
+        >>> store.new_join(0, 'Jack', 3)
+        0
+        >>> store.new_join(1, 'Jill', 3)
+        1
+        >>> store.finish_check_out(10, store.customer_id('Jack')) is None
+        True
+        >>> store.customers[store.customer_id('Jack')] is None
+        True
+        >>> store.statistics.num_customers, store.statistics.max_wait
+        (1, 10)
         """
 
-        customer = self.waiting_customers[name]
+        customer = self.customers[customer_id]
+        self.customers.remove(customer_id)
         customer.end_waiting = timestamp
-        self.finished_customers[customer.name] = customer
+        self.statistics.record(customer)
         current_line = self.check_out_lines.lines[customer.which_line]
-        current_line.customers.pop(0)
+        if self.wait_distribution is not None:
+            self.wait_distribution.record(customer, current_line)
+        if self.trace is not None:
+            self.trace.record(customer, current_line)
+        current_line.customers.popleft()
+        self.check_out_lines.update_line(customer.which_line)
+        if self.sampler is not None:
+            self.sampler.record(timestamp, customer.which_line)
         if not len(current_line.customers) == 0:
-            next_name = \
-                self.check_out_lines.lines[customer.which_line].customers[
-                    0].name
-            return next_name
+            return self.customers[current_line.customers[0]]
         else:
             return None
 
     def close_line(self, timestamp, which_line):
         """
         Processes the CloseLine event.
-        Returns a list of customers who have to be reassigend.
+        Returns a list of customers who have to be reassigend: everyone in
+        the Line but the Customer checking out, from the back of the Line
+        to the front. They leave the Line, and are in no Line until they
+        rejoin one.
         @type self: GroceryStore
         @type timestamp: int
         @type which_line: int
         @rtype: list[Customer]
+
+        >>> store = GroceryStore({'cashier_count': 2, 'express_count': 0,
+        ...                       'self_serve_count': 0, 'line_capacity': 10})
+        >>> [store.new_join(0, name, 9) for name in ['Jack', 'Jill', 'Jim',
+        ...                                          'Fred', 'Ann']]
+        [0, 1, 0, 1, 0]
+        >>> [c.name for c in store.close_line(5, 0)]
+        ['Ann', 'Jim']
+        >>> len(store.check_out_lines.lines[0].customers)
+        1
         """
         closed_line = self.check_out_lines.lines[which_line]
         closed_line.closed = True
         return_customers = []
         while len(closed_line.customers) > 1:
-            current_customer = closed_line.customers.pop()
-            assigned_line = self.assign_customer(current_customer)
-            current_customer.which_line = assigned_line
+            current_customer = self.customers[closed_line.customers.pop()]
             return_customers.append(current_customer)
+        self.check_out_lines.update_line(which_line)
+        if self.sampler is not None:
+            self.sampler.record(timestamp, which_line)
         return return_customers
 
+    def rejoin(self, timestamp, customer_id):
+        """
+        Processes a Customer displaced from a closed Line joining another.
+        Returns the number of the Line they joined.
+        @type self: GroceryStore
+        @type timestamp: int
+        @type customer_id: int
+        @rtype: int
+        """
+        assigned_line = self.assign_customer(self.customers[customer_id])
+        if self.sampler is not None:
+            self.sampler.record(timestamp, assigned_line)
+        return assigned_line
+
+
+def _already_in_store(timestamp, name):
+    """
+    Returns the error for a Customer named <name> arriving at <timestamp>
+    while still in the store.
+    @type timestamp: int
+    @type name: str
+    @rtype: ValueError
+    """
+    return ValueError('Customer {} arrived at time {} while still in the '
+                      'store'.format(name, timestamp))
+
+
+class CustomerStatistics:
+    """
+    Waiting time statistics over a stream of Customers, kept in constant
+    memory so that Customers can be discarded once they are recorded.
+
+    === Public attributes ===
+    @type num_customers: int # how many Customers have been recorded
+    @type max_wait: int # the longest wait recorded, or -1 if none
+    @type total_wait: int # the sum of all waits recorded
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty CustomerStatistics.
+        @type self: CustomerStatistics
+        @rtype: None
+
+        >>> statistics = CustomerStatistics()
+        >>> statistics.num_customers, statistics.max_wait
+        (0, -1)
+        """
+        self.num_customers = 0
+        self.max_wait = -1
+        self.total_wait = 0
+
+    def record(self, customer):
+        """
+        Adds a Customer who has finished checking out to the statistics.
+        @type self: CustomerStatistics
+        @type customer: Customer
+        @rtype: None
+
+        >>> statistics = CustomerStatistics()
+        >>> jack = Customer('Jack', 3)
+        >>> jack.end_waiting = 12
+        >>> statistics.record(jack)
+        >>> statistics.num_customers, statistics.max_wait
+        (1, 12)
+        """
+        wait = customer.get_wait_time()
+        self.num_customers += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    def mean_wait(self):
+        """
+        Returns the average wait of the recorded Customers, or 0.0 if there
+        are none.
+        @type self: CustomerStatistics
+        @rtype: float
+
+        >>> statistics = CustomerStatistics()
+        >>> statistics.mean_wait()
+        0.0
+        >>> for wait in [4, 9]:
+        ...     customer = Customer('Jack', 3)
+        ...     customer.end_waiting = wait
+        ...     statistics.record(customer)
+        >>> statistics.mean_wait()
+        6.5
+        """
+        if self.num_customers == 0:
+            return 0.0
+        else:
+            return self.total_wait / self.num_customers
+
 
 class Customer:
     """
@@ -175,15 +405,20 @@ class Customer:
     @type start_waiting: int
     @type end_waiting: int
     @type which_line: int
+    @type customer_id: int # the Customer's ID in its GroceryStore, or -1
 
     """
+    # Customers have no __dict__, which makes each one much smaller.
+    __slots__ = ('name', 'items', 'start_waiting', 'end_waiting',
+                 'which_line', 'customer_id')
 
-    def __init__(self, name, items):
+    def __init__(self, name, items, customer_id=-1):
         """
         Initializes a Customer object.
         @type self: Customer
         @type name: str
         @type items: int
+        @type customer_id: int
         @rtype: None
 
         >>> a = Customer('Jack', 3)
@@ -197,6 +432,7 @@ class Customer:
         self.start_waiting = 0
         self.end_waiting = 0
         self.which_line = -1
+        self.customer_id = customer_id
 
     def get_wait_time(self):
         """
@@ -211,14 +447,444 @@ class Customer:
         return self.end_waiting - self.start_waiting
 
 
+class CustomerIndex:
+    """
+    An abstract class to model the Customers in a GroceryStore, indexed by
+    customer ID, along with the customer ID of every name seen so far.
+
+    IDs are handed out in order from 0, and a name keeps its ID when it
+    comes back, so names are hashed once per arrival and never while
+    checking out. Lines hold customer IDs rather than Customers.
+
+    customers[i] is the Customer with ID i if they are in the store, and
+    None otherwise; len(customers) is the number of IDs handed out.
+    """
+    # === Private Attributes ===
+    # @type _ids: dict[str, int]
+    #     The customer ID of every name seen so far.
+
+    def __init__(self):
+        """
+        Initializes an empty CustomerIndex.
+        @type self: CustomerIndex
+        @rtype: None
+        """
+        self._ids = {}
+
+    def __len__(self):
+        """
+        Returns the number of customer IDs handed out.
+        To be implemented in respective subclasses.
+        @type self: CustomerIndex
+        @rtype: int
+        """
+        raise NotImplementedError
+
+    def __getitem__(self, customer_id):
+        """
+        Returns the Customer with ID <customer_id>, or None if they are not
+        in the store.
+        To be implemented in respective subclasses.
+        @type self: CustomerIndex
+        @type customer_id: int
+        @rtype: Customer | None
+        """
+        raise NotImplementedError
+
+    def id_of(self, name):
+        """
+        Returns the customer ID of <name>, giving it the next unused one if
+        it has not been seen before.
+        @type self: CustomerIndex
+        @type name: str
+        @rtype: int
+        """
+        customer_id = self._ids.get(name)
+        if customer_id is None:
+            customer_id = len(self._ids)
+            self._ids[name] = customer_id
+            self._add_id(name)
+        return customer_id
+
+    def _add_id(self, name):
+        """
+        Makes room for the next customer ID, just given to <name>.
+        To be implemented in respective subclasses.
+        @type self: CustomerIndex
+        @type name: str
+        @rtype: None
+        """
+        raise NotImplementedError
+
+    def new(self, customer_id, name, items, timestamp):
+        """
+        Creates the Customer with ID <customer_id>, who starts waiting at
+        <timestamp>, and returns them.
+        To be implemented in respective subclasses.
+        @type self: CustomerIndex
+        @type customer_id: int
+            Precondition: returned by id_of(name), and not in the store.
+        @type name: str
+        @type items: int
+        @type timestamp: int
+        @rtype: Customer
+        """
+        raise NotImplementedError
+
+    def remove(self, customer_id):
+        """
+        Records that the Customer with ID <customer_id> has left the store.
+        To be implemented in respective subclasses.
+        @type self: CustomerIndex
+        @type customer_id: int
+        @rtype: None
+        """
+        raise NotImplementedError
+
+    def memory_summary(self):
+        """
+        Returns the memory used by the Customers, for the simulation
+        stats: the number of customer IDs, how many are in the store, and
+        the bytes used in total and per ID. Names themselves are not
+        counted, as they are shared with the events.
+        To be implemented in respective subclasses.
+        @type self: CustomerIndex
+        @rtype: dict[str, int | float]
+        """
+        raise NotImplementedError
+
+
+class CustomerTable(CustomerIndex):
+    """
+    A CustomerIndex which keeps one Customer object per Customer in the
+    store. See CustomerColumns for one which uses less memory per
+    Customer.
+    """
+    # === Private Attributes ===
+    # @type _customers: list[Customer | None]
+    #     One entry per ID: the Customer with that ID if they are in the
+    #     store, and None otherwise.
+
+    def __init__(self):
+        """
+        Initializes an empty CustomerTable.
+        @type self: CustomerTable
+        @rtype: None
+        """
+        super().__init__()
+        self._customers = []
+
+    def __len__(self):
+        """
+        Overrides the __len__ method in super.
+        @type self: CustomerTable
+        @rtype: int
+        """
+        return len(self._customers)
+
+    def __getitem__(self, customer_id):
+        """
+        Overrides the __getitem__ method in super.
+        @type self: CustomerTable
+        @type customer_id: int
+        @rtype: Customer | None
+        """
+        return self._customers[customer_id]
+
+    def _add_id(self, name):
+        """
+        Overrides the _add_id method in super.
+        @type self: CustomerTable
+        @type name: str
+        @rtype: None
+        """
+        self._customers.append(None)
+
+    def new(self, customer_id, name, items, timestamp):
+        """
+        Overrides the new method in super.
+        @type self: CustomerTable
+        @type customer_id: int
+        @type name: str
+        @type items: int
+        @type timestamp: int
+        @rtype: Customer
+
+        >>> table = CustomerTable()
+        >>> jack = table.new(table.id_of('Jack'), 'Jack', 3, 5)
+        >>> table[0] is jack
+        True
+        >>> table.remove(0)
+        >>> table[0] is None
+        True
+        >>> len(table)
+        1
+        """
+        customer = Customer(name, items, customer_id)
+        customer.start_waiting = timestamp
+        self._customers[customer_id] = customer
+        return customer
+
+    def remove(self, customer_id):
+        """
+        Overrides the remove method in super.
+        @type self: CustomerTable
+        @type customer_id: int
+        @rtype: None
+        """
+        self._customers[customer_id] = None
+
+    def memory_summary(self):
+        """
+        Overrides the memory_summary method in super.
+        @type self: CustomerTable
+        @rtype: dict[str, int | float]
+
+        >>> table = CustomerTable()
+        >>> _ = table.new(table.id_of('Jack'), 'Jack', 3, 0)
+        >>> summary = table.memory_summary()
+        >>> summary['customers'], summary['in_store']
+        (1, 1)
+        """
+        in_store = 0
+        used = sys.getsizeof(self._ids) + sys.getsizeof(self._customers)
+        for customer in self._customers:
+            if customer is not None:
+                in_store += 1
+                used += sys.getsizeof(customer)
+        return _memory_entries(len(self._customers), in_store, used)
+
+
+class CustomerColumns(CustomerIndex):
+    """
+    A CustomerIndex which keeps the attributes of every Customer in one
+    array per attribute, indexed by ID, instead of one object per Customer.
+
+    The Customers it hands out are CustomerRows: short-lived views onto one
+    ID's entries. Since lines hold customer IDs, no object is kept per
+    Customer at all, which suits bulk runs where many Customers are in the
+    store at once. Reading and writing attributes is slower, though.
+    """
+    # === Private Attributes ===
+    # @type _present: bytearray
+    #     1 for each ID whose Customer is in the store, and 0 otherwise.
+    # @type _names: list[str]
+    # @type _items: array[int]
+    # @type _start_waiting: array[int]
+    # @type _end_waiting: array[int]
+    # @type _which_line: array[int]
+    #     The attributes of each ID's Customer.
+
+    def __init__(self):
+        """
+        Initializes an empty CustomerColumns.
+        @type self: CustomerColumns
+        @rtype: None
+        """
+        super().__init__()
+        self._present = bytearray()
+        self._names = []
+        self._items = array('i')
+        self._start_waiting = array('q')
+        self._end_waiting = array('q')
+        self._which_line = array('i')
+
+    def __len__(self):
+        """
+        Overrides the __len__ method in super.
+        @type self: CustomerColumns
+        @rtype: int
+        """
+        return len(self._names)
+
+    def __getitem__(self, customer_id):
+        """
+        Overrides the __getitem__ method in super.
+        @type self: CustomerColumns
+        @type customer_id: int
+        @rtype: CustomerRow | None
+        """
+        if self._present[customer_id]:
+            return CustomerRow(self, customer_id)
+        else:
+            return None
+
+    def _add_id(self, name):
+        """
+        Overrides the _add_id method in super.
+        @type self: CustomerColumns
+        @type name: str
+        @rtype: None
+        """
+        self._present.append(0)
+        self._names.append(name)
+        for column in (self._items, self._start_waiting,
+                       self._end_waiting, self._which_line):
+            column.append(0)
+
+    def new(self, customer_id, name, items, timestamp):
+        """
+        Overrides the new method in super.
+        @type self: CustomerColumns
+        @type customer_id: int
+        @type name: str
+        @type items: int
+        @type timestamp: int
+        @rtype: CustomerRow
+
+        >>> table = CustomerColumns()
+        >>> jack = table.new(table.id_of('Jack'), 'Jack', 3, 5)
+        >>> jack.name, jack.items, jack.start_waiting
+        ('Jack', 3, 5)
+        >>> jack.end_waiting = 12
+        >>> table[0].get_wait_time()
+        7
+        >>> table.remove(0)
+        >>> table[0] is None
+        True
+        """
+        self._present[customer_id] = 1
+        self._items[customer_id] = items
+        self._start_waiting[customer_id] = timestamp
+        self._end_waiting[customer_id] = 0
+        self._which_line[customer_id] = -1
+        return CustomerRow(self, customer_id)
+
+    def remove(self, customer_id):
+        """
+        Overrides the remove method in super.
+        @type self: CustomerColumns
+        @type customer_id: int
+        @rtype: None
+        """
+        self._present[customer_id] = 0
+
+    def memory_summary(self):
+        """
+        Overrides the memory_summary method in super.
+        @type self: CustomerColumns
+        @rtype: dict[str, int | float]
+        """
+        used = sys.getsizeof(self._ids)
+        for column in (self._present, self._names, self._items,
+                       self._start_waiting, self._end_waiting,
+                       self._which_line):
+            used += sys.getsizeof(column)
+        return _memory_entries(len(self), sum(self._present), used)
+
+
+def _memory_entries(customers, in_store, used):
+    """
+    Returns the entries of a memory summary of <customers> customer IDs,
+    <in_store> of them in the store, using <used> bytes.
+    @type customers: int
+    @type in_store: int
+    @type used: int
+    @rtype: dict[str, int | float]
+
+    >>> _memory_entries(4, 1, 200)['bytes_per_customer']
+    50.0
+    """
+    return {'customers': customers, 'in_store': in_store, 'bytes': used,
+            'bytes_per_customer': used / customers if customers else 0.0}
+
+
+class CustomerRow:
+    """
+    A view of one Customer in a CustomerColumns. It has the same attributes
+    and methods as a Customer, which read and write the table's arrays.
+
+    === Public attributes ===
+    @type customer_id: int
+    """
+    # === Private Attributes ===
+    # @type _table: CustomerColumns
+    #     The table holding this Customer.
+    __slots__ = ('_table', 'customer_id')
+
+    def __init__(self, table, customer_id):
+        """
+        Initializes a view of the Customer with ID <customer_id> in <table>.
+        @type self: CustomerRow
+        @type table: CustomerColumns
+        @type customer_id: int
+        @rtype: None
+        """
+        self._table = table
+        self.customer_id = customer_id
+
+    @property
+    def name(self):
+        """
+        @type self: CustomerRow
+        @rtype: str
+        """
+        return self._table._names[self.customer_id]
+
+    @property
+    def items(self):
+        """
+        @type self: CustomerRow
+        @rtype: int
+        """
+        return self._table._items[self.customer_id]
+
+    @property
+    def start_waiting(self):
+        """
+        @type self: CustomerRow
+        @rtype: int
+        """
+        return self._table._start_waiting[self.customer_id]
+
+    @start_waiting.setter
+    def start_waiting(self, value):
+        self._table._start_waiting[self.customer_id] = value
+
+    @property
+    def end_waiting(self):
+        """
+        @type self: CustomerRow
+        @rtype: int
+        """
+        return self._table._end_waiting[self.customer_id]
+
+    @end_waiting.setter
+    def end_waiting(self, value):
+        self._table._end_waiting[self.customer_id] = value
+
+    @property
+    def which_line(self):
+        """
+        @type self: CustomerRow
+        @rtype: int
+        """
+        return self._table._which_line[self.customer_id]
+
+    @which_line.setter
+    def which_line(self, value):
+        self._table._which_line[self.customer_id] = value
+
+    def get_wait_time(self):
+        """
+        Returns how long this Customer has been waiting.
+        @type self: CustomerRow
+        @rtype: int
+        """
+        table = self._table
+        return table._end_waiting[self.customer_id] - \
+            table._start_waiting[self.customer_id]
+
+
 class Line:
     """
     An abstract class to model a check out line.
-    A Line essentially stores a list of Customers.
+    A Line essentially stores a queue of Customers, by customer ID, kept in
+    a deque so that customers can be removed from either end in O(1) time.
 
     === Public attributes ===
     @type closed: bool # keeps track of if the line is closed
-    @type customers: [Customer]
+    @type customers: deque[int] # IDs; the first customer is checking out
     @type capacity: int # the max number of customers a line can have
     @type is_express_line: bool
     """
@@ -237,8 +903,10 @@ class Line:
         True
         >>> this_line.closed
         False
+        >>> len(this_line.customers)
+        0
         """
-        self.customers = []
+        self.customers = deque()
         self.capacity = capacity
         self.closed = False
         self.is_express_line = is_express_line
@@ -259,13 +927,24 @@ class Line:
             return False
         elif self.closed:
             return False
-        elif self.is_express_line:
-            if customer.items >= 8:
-                return False
-            else:
-                return True
         else:
-            return True
+            return self.is_eligible(customer)
+
+    def is_eligible(self, customer):
+        """
+        Returns True if a Customer is allowed to use this kind of line,
+        whether or not the line is currently open or full.
+        @type self: Line
+        @type customer: Customer
+        @rtype: bool
+
+        >>> this_line = Line(10, True)
+        >>> this_line.is_eligible(Customer('Jack', 3))
+        True
+        >>> this_line.is_eligible(Customer('Jill', 8))
+        False
+        """
+        return not (self.is_express_line and customer.items >= 8)
 
     def add_customer(self, customer):
         """
@@ -280,7 +959,7 @@ class Line:
         >>> this_line.add_customer(customer)
         True
         """
-        self.customers.append(customer)
+        self.customers.append(customer.customer_id)
         return True
 
     def get_check_out_time(self, customer):
@@ -412,6 +1091,17 @@ class LineList:
     === Public attributes ===
     @type lines: list[Line]
     """
+    # === Private Attributes ===
+    # @type _indexes: list[_LineIndex]
+    #     One index for each kind of line (cashier, express and self serve),
+    #     covering that kind's run of consecutive lines in <lines>.
+    # @type _index_of: list[_LineIndex]
+    #     The index covering each line in <lines>.
+    #
+    # === Representation Invariants ===
+    # For every line x, the key stored for x in _index_of[x] is
+    # self._key(x). Whoever changes a line's customers or closed flag must
+    # call update_line afterwards to keep this true.
 
     def __init__(self, cashier, express, self_serve, capacity):
         """
@@ -424,16 +1114,27 @@ class LineList:
         @rtype: None
         """
         self.lines = []
-        for x in range(cashier):
-            self.lines.append(CashierLine(capacity, False))
-        for x in range(express):
-            self.lines.append(ExpressLine(capacity, True))
-        for x in range(self_serve):
-            self.lines.append(SelfServeLine(capacity, False))
+        self._indexes = []
+        self._index_of = []
+        for count, kind in [(cashier, CashierLine), (express, ExpressLine),
+                            (self_serve, SelfServeLine)]:
+            if count == 0:
+                continue
+            index = _LineIndex(len(self.lines), count)
+            for x in range(count):
+                self.lines.append(kind(capacity, kind is ExpressLine))
+                self._index_of.append(index)
+            self._indexes.append(index)
+        for x in range(len(self.lines)):
+            self.update_line(x)
 
     def assign_customer(self, customer):
         """
-        Returns which line a Customer should be assigned to.
+        Returns which line a Customer should be assigned to: the open line
+        with the fewest customers that can take them, choosing the lowest
+        numbered line on ties. Returns -1 if no line can take them.
+
+        Takes O(log n) time for n lines.
         @type self: LineList
         @type customer: Customer
         @rtype: int
@@ -442,15 +1143,147 @@ class LineList:
         >>> customer = Customer('Jack', 3)
         >>> check_out_lines.assign_customer(customer)
         0
+        >>> check_out_lines = LineList(1, 1, 0, 10)
+        >>> check_out_lines.lines[0].add_customer(customer)
+        True
+        >>> check_out_lines.update_line(0)
+        >>> check_out_lines.assign_customer(Customer('Jill', 2))
+        1
+        >>> check_out_lines.assign_customer(Customer('Jim', 9))
+        0
         """
-        minimum = self.lines[0].capacity
-        line = -1
-        for x in range(len(self.lines)):
-            if self.lines[x].can_add_customer(customer):
-                if len(self.lines[x].customers) < minimum:
-                    minimum = len(self.lines[x].customers)
-                    line = x
-        return line
+        best = _UNAVAILABLE
+        for index in self._indexes:
+            if index.best() < best and \
+                    self.lines[index.first].is_eligible(customer):
+                best = index.best()
+        if best == _UNAVAILABLE:
+            return -1
+        else:
+            return best % len(self.lines)
+
+    def update_line(self, which_line):
+        """
+        Records a change to the customers or closed state of a Line, so
+        that assign_customer sees it. Takes O(log n) time for n lines.
+        @type self: LineList
+        @type which_line: int
+            The number of the changed line. Negative numbers count from
+            the end, as for list indexing.
+        @rtype: None
+        """
+        which_line %= len(self.lines)
+        self._index_of[which_line].update(which_line, self._key(which_line))
+
+    def _key(self, which_line):
+        """
+        Returns the key ranking Line <which_line> in its _LineIndex: lower
+        keys are better, and _UNAVAILABLE means the line takes no one.
+        Keys order open lines by length and then by line number.
+        @type self: LineList
+        @type which_line: int
+        @rtype: int
+        """
+        line = self.lines[which_line]
+        if line.closed or len(line.customers) >= line.capacity:
+            return _UNAVAILABLE
+        else:
+            return len(line.customers) * len(self.lines) + which_line
+
+
+# The key of a line that cannot take any more customers. Larger than the key
+# of any open line.
+_UNAVAILABLE = float('inf')
+
+
+class _LineIndex:
+    """
+    A segment tree over a run of consecutive lines, for finding the line
+    with the smallest key in O(1) time and changing a key in O(log n) time.
+    === Public attributes ===
+    @type first: int
+        The number of the first line covered by this index.
+    """
+    # === Private Attributes ===
+    # @type _size: int
+    #     The number of leaves in the tree, a power of two.
+    # @type _tree: list[int | float]
+    #     The tree, stored as an array: node i has children 2i and 2i + 1,
+    #     and the root is node 1. Leaf _size + k holds the key of line
+    #     first + k, and each other node holds the smaller of its
+    #     children's keys. Unused leaves hold _UNAVAILABLE.
+
+    def __init__(self, first, count):
+        """
+        Initializes a _LineIndex over lines first to first + count - 1,
+        none of which is available yet.
+        @type self: _LineIndex
+        @type first: int
+        @type count: int
+        @rtype: None
+
+        >>> index = _LineIndex(3, 3)
+        >>> index.update(4, 12)
+        >>> index.update(5, 7)
+        >>> index.best()
+        7
+        >>> index.update(5, _UNAVAILABLE)
+        >>> index.best()
+        12
+        """
+        self.first = first
+        self._size = 1
+        while self._size < count:
+            self._size *= 2
+        self._tree = [_UNAVAILABLE] * (2 * self._size)
+
+    def update(self, which_line, key):
+        """
+        Sets the key of Line <which_line>.
+        @type self: _LineIndex
+        @type which_line: int
+        @type key: int | float
+        @rtype: None
+        """
+        tree = self._tree
+        node = self._size + which_line - self.first
+        tree[node] = key
+        node //= 2
+        while node > 0:
+            left = tree[2 * node]
+            right = tree[2 * node + 1]
+            tree[node] = left if left < right else right
+            node //= 2
+
+    def best(self):
+        """
+        Returns the smallest key of any line in this index.
+        @type self: _LineIndex
+        @rtype: int | float
+        """
+        return self._tree[1]
+
+
+def load_config(filename):
+    """Return the configuration stored in the json file <filename>.
+
+    The configuration is a dictionary with the keys 'cashier_count',
+    'express_count', 'self_serve_count' and 'line_capacity', plus any
+    optional simulation settings. If <filename> is already such a
+    dictionary, a copy of it is returned instead.
+
+    @type filename: str | dict[str, object]
+    @rtype: dict[str, object]
+
+    >>> load_config('config.json')['line_capacity']
+    10
+    >>> load_config({'line_capacity': 3})['line_capacity']
+    3
+    """
+    if isinstance(filename, dict):
+        return dict(filename)
+    with open(filename, 'r') as file:
+        return json.load(file)
 
 # You can run a basic test here using the default 'config.json'
 # file we provided.
@@ -0,0 +1,165 @@
+"""Parameter sweeps over grocery store configurations.
+
+This file runs one GroceryStoreSimulation per combination of configuration
+overrides, spreading the runs over a pool of worker processes. The event
+file is read once, in the parent process, and handed to each worker when
+it starts.
+
+Usage:
+    python sweep.py config.json events.txt --grid cashier_count=1,2,3 \
+        --grid line_capacity=5,10 [--processes 4]
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+
+from event import create_event_list
+from simulation import GroceryStoreSimulation
+from store import load_config
+
+# The events being simulated, set in each worker process by _init_worker.
+_worker_events = None
+
+
+def expand_grid(grid):
+    """Return every combination of the values in <grid>.
+
+    @type grid: dict[str, list[object]]
+        Maps each configuration key to the values to try for it.
+    @rtype: list[dict[str, object]]
+
+    >>> expand_grid({'cashier_count': [1, 2], 'line_capacity': [5]})
+    [{'cashier_count': 1, 'line_capacity': 5}, \
+{'cashier_count': 2, 'line_capacity': 5}]
+    >>> expand_grid({})
+    [{}]
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values))
+            for values in itertools.product(*[grid[key] for key in keys])]
+
+
+def run_sweep(base_config, event_file, grid, processes=None):
+    """Run the events in <event_file> under every configuration in <grid>.
+
+    Each configuration is <base_config> with one combination of the values
+    in <grid> applied on top (see expand_grid). Return one row per
+    configuration, in the order expand_grid gives them: the overrides
+    applied, and the stats the simulation returned. The event file is
+    read once, using the 'event_cache' setting of <base_config>.
+
+    @type base_config: str | dict[str, object]
+        A configuration file, or the configuration itself.
+    @type event_file: str
+    @type grid: dict[str, list[object]]
+    @type processes: int | None
+        The number of worker processes; by default, one per CPU.
+    @rtype: list[(dict[str, object], dict[str, object])]
+
+    >>> base = dict(load_config('config.json'), event_cache=False)
+    >>> rows = run_sweep(base, 'events.txt', {'self_serve_count': [0, 1]},
+    ...                  processes=2)
+    >>> [(overrides['self_serve_count'], stats['max_wait'])
+    ...  for overrides, stats in rows]
+    [(0, 14), (1, 21)]
+    """
+    base = load_config(base_config)
+    overrides = expand_grid(grid)
+    configs = []
+    for override in overrides:
+        config = dict(base)
+        config.update(override)
+        configs.append(config)
+
+    events = create_event_list(event_file, base.get('event_cache', True))
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(events,)) as pool:
+        results = pool.map(_run_config, configs)
+    return list(zip(overrides, results))
+
+
+def _init_worker(events):
+    """Store <events> for the simulations run by this worker process.
+
+    @type events: list[Event]
+    @rtype: None
+    """
+    global _worker_events
+    _worker_events = events
+
+
+def _run_config(config):
+    """Return the stats of simulating this worker's events under <config>.
+
+    @type config: dict[str, object]
+    @rtype: dict[str, object]
+    """
+    return GroceryStoreSimulation(config).run(_worker_events)
+
+
+def format_table(rows):
+    """Return <rows> from run_sweep as a tab-separated table.
+
+    Only the overrides and the stats with simple values get a column.
+
+    @type rows: list[(dict[str, object], dict[str, object])]
+    @rtype: str
+
+    >>> table = format_table([({'line_capacity': 5},
+    ...                        {'num_customers': 6, 'max_wait': 21})])
+    >>> table.splitlines()
+    ['line_capacity\\tnum_customers\\tmax_wait', '5\\t6\\t21']
+    """
+    if len(rows) == 0:
+        return ''
+    overrides, stats = rows[0]
+    columns = [(False, key) for key in overrides] + \
+        [(True, key) for key in stats
+         if isinstance(stats[key], (int, float, str))]
+    lines = ['\t'.join(key for _, key in columns)]
+    for overrides, stats in rows:
+        lines.append('\t'.join(
+            str(stats[key] if is_stat else overrides[key])
+            for is_stat, key in columns))
+    return '\n'.join(lines)
+
+
+def _parse_grid_entry(entry):
+    """Return the (key, values) pair described by <entry>.
+
+    @type entry: str
+        A configuration key and comma-separated values, e.g.
+        'cashier_count=1,2,3'. Values are read as JSON where possible.
+    @rtype: (str, list[object])
+
+    >>> _parse_grid_entry('cashier_count=1,2')
+    ('cashier_count', [1, 2])
+    >>> _parse_grid_entry('event_queue=priority,calendar')
+    ('event_queue', ['priority', 'calendar'])
+    """
+    key, _, values = entry.partition('=')
+    parsed = []
+    for value in values.split(','):
+        try:
+            parsed.append(json.loads(value))
+        except ValueError:
+            parsed.append(value)
+    return key, parsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Simulate an event file under many store configurations.')
+    parser.add_argument('config', help='the base store configuration file')
+    parser.add_argument('events', help='the event file to simulate')
+    parser.add_argument('--grid', action='append', default=[],
+                        metavar='KEY=V1,V2,...',
+                        help='configuration values to try; may be repeated')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of worker processes (default: CPUs)')
+    args = parser.parse_args()
+
+    sweep_grid = dict(_parse_grid_entry(entry) for entry in args.grid)
+    print(format_table(run_sweep(args.config, args.events, sweep_grid,
+                                 args.processes)))
@@ -0,0 +1,44 @@
+# Tests that performing same-timestamp events in batches gives the same
+# results as performing them one by one.
+
+import unittest
+
+from event import NewArrive, CloseLine, do_batch
+from simulation import GroceryStoreSimulation
+from store import GroceryStore
+from testing_util import MODES, random_workload
+
+
+class TestBatch(unittest.TestCase):
+    def test_batch_matches_event_by_event(self):
+        for seed in range(100):
+            config, events = random_workload(seed)
+            for mode in MODES:
+                mode_config = dict(config, **mode)
+                expected = GroceryStoreSimulation(mode_config).run(events)
+                with self.subTest(seed=seed, mode=mode):
+                    self.assertEqual(GroceryStoreSimulation(
+                        dict(mode_config, batch=True)).run(events), expected)
+
+    def test_do_batch_spawns_in_event_order(self):
+        config = {'cashier_count': 2, 'express_count': 0,
+                  'self_serve_count': 0, 'line_capacity': 5}
+        events = [NewArrive(0, 'Jack', 3), NewArrive(0, 'Jill', 2),
+                  NewArrive(0, 'Jim', 4), CloseLine(0, 0),
+                  NewArrive(0, 'Ann', 1)]
+        one_by_one = GroceryStore(config)
+        expected = []
+        for event in events:
+            expected.extend(event.do(one_by_one) or [])
+        batched = GroceryStore(config)
+        spawned = do_batch(events, batched)
+        self.assertEqual([(type(event), vars(event)) for event in spawned],
+                         [(type(event), vars(event)) for event in expected])
+        self.assertEqual([list(line.customers)
+                          for line in batched.check_out_lines.lines],
+                         [list(line.customers)
+                          for line in one_by_one.check_out_lines.lines])
+
+
+if __name__ == '__main__':
+    unittest.main()
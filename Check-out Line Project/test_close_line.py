@@ -0,0 +1,39 @@
+# Tests that closing a line with the chained Rejoin event gives the same
+# results as rejoining each displaced customer with their own event, all
+# queued when the line closes, in every engine mode.
+
+import unittest
+from unittest import mock
+
+from event import CloseLine, Rejoin
+from simulation import GroceryStoreSimulation
+from testing_util import MODES, random_workload
+
+
+def rearrive(self, store):
+    """CloseLine.do as one event per displaced customer, all queued when
+    the line closes.
+    """
+    customers = store.close_line(self.timestamp, self.which_line)
+    return [Rejoin(self.timestamp + 1 + x, [customer.customer_id])
+            for x, customer in enumerate(customers)]
+
+
+class TestCloseLine(unittest.TestCase):
+    def test_chained_rejoin_matches_per_customer_arrivals(self):
+        for seed in range(150):
+            config, events = random_workload(seed)
+            with mock.patch.object(CloseLine, 'do', rearrive):
+                expected = GroceryStoreSimulation(config).run(events)
+                quantiles = GroceryStoreSimulation(
+                    dict(config, wait_quantiles=True)).run(events)
+            for mode in MODES:
+                with self.subTest(seed=seed, mode=mode):
+                    stats = GroceryStoreSimulation(
+                        dict(config, **mode)).run(events)
+                    self.assertEqual(stats, quantiles if mode.get(
+                        'wait_quantiles') else expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# Tests of the event file cache used by create_event_list.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from event import create_event_list
+
+
+class TestEventCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        filename = os.path.join(self.directory, 'events.txt')
+        with open(filename, 'w') as file:
+            file.write(text)
+        return filename
+
+    def test_cached_events_are_the_same(self):
+        filename = self.write('0 Arrive Jack 3\n5 Arrive Jill 1\n9 Close 0\n')
+        first = create_event_list(filename, self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        second = create_event_list(filename, self.cache_dir)
+        self.assertEqual([vars(event) for event in second],
+                         [vars(event) for event in first])
+
+    def test_events_too_big_for_the_cache(self):
+        filename = self.write('0 Arrive Jack 3\n5 Arrive Jill 2147483648\n')
+        for _ in range(2):
+            events = create_event_list(filename, self.cache_dir)
+            self.assertEqual(events[1].items, 2 ** 31)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
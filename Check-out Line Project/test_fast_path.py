@@ -0,0 +1,85 @@
+# Tests that the fast path for single-line stores gives the same stats as
+# performing the events one by one.
+
+import os
+import tempfile
+import unittest
+
+import fast_path
+from simulation import GroceryStoreSimulation
+from store import Customer, ExpressLine
+from testing_util import random_workload
+from workload import generate_events, write_event_file
+
+# The configuration of a store with a single line of each kind.
+CONFIGS = [{'cashier_count': 1, 'express_count': 0, 'self_serve_count': 0},
+           {'cashier_count': 0, 'express_count': 1, 'self_serve_count': 0},
+           {'cashier_count': 0, 'express_count': 0, 'self_serve_count': 1}]
+
+
+def coefficients(kind):
+    """Return the check out time per item and the fixed check out time of
+    a line of class <kind>.
+    """
+    line = kind(1, kind is ExpressLine)
+    fixed = line.get_check_out_time(Customer('', 0))
+    return line.get_check_out_time(Customer('', 1)) - fixed, fixed
+
+
+class TestFastPath(unittest.TestCase):
+    def check(self, lindley):
+        # Compares <lindley> against performing events, over random
+        # workloads at every kind of line.
+        for seed in range(100):
+            store, events = random_workload(seed, closes=False)
+            timestamps = [event.timestamp for event in events]
+            items = [event.items for event in events]
+            for config in CONFIGS:
+                config = dict(config, line_capacity=store['line_capacity'])
+                kind = fast_path.single_line_kind(config)
+                expected = GroceryStoreSimulation(config).run(events)
+                with self.subTest(seed=seed, kind=kind.__name__):
+                    self.assertEqual(
+                        lindley(timestamps, items, *coefficients(kind)),
+                        (expected['total_time'], expected['max_wait']))
+
+    def test_lindley_loop(self):
+        self.check(fast_path._lindley_loop)
+
+    @unittest.skipIf(fast_path.numpy is None, 'NumPy is not installed')
+    def test_lindley_arrays(self):
+        numpy = fast_path.numpy
+        self.check(lambda timestamps, items, per_item, fixed:
+                   fast_path._lindley_arrays(
+                       numpy.asarray(timestamps, dtype=numpy.int64),
+                       numpy.asarray(items, dtype=numpy.int64),
+                       per_item, fixed))
+
+
+class TestReadArrivals(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_text_file_matches_events(self):
+        for closes in [[], [(30, 0)]]:
+            write_event_file(self.filename, 100, seed=4, closes=closes)
+            with self.subTest(closes=closes):
+                self.assertEqual(
+                    fast_path.read_arrivals(self.filename),
+                    fast_path.read_arrivals(
+                        list(generate_events(100, seed=4, closes=closes))))
+
+    def test_text_file_is_read_up_to_first_close(self):
+        # The lines after the Close are not events at all, so reading
+        # them would fail.
+        with open(self.filename, 'w') as file:
+            file.write('0 Arrive Jack 3\n5 Close 0\n7 Arrive Jill many\n')
+        self.assertIsNone(fast_path.read_arrivals(self.filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# Tests that feeding a simulation live with submit and advance_to gives the
+# same stats as running it on the whole event list.
+
+import random
+import unittest
+
+from event import NewArrive
+from simulation import GroceryStoreSimulation
+from workload import generate_events
+
+CONFIG = {'cashier_count': 2, 'express_count': 1, 'self_serve_count': 1,
+          'line_capacity': 3}
+
+
+class TestLiveFeed(unittest.TestCase):
+    def test_feed_matches_run(self):
+        for seed in range(30):
+            events = list(generate_events(150, seed=seed, rate=0.5,
+                                          closes=[(60, 1), (100, 3)]))
+            rng = random.Random(seed)
+            sim = GroceryStoreSimulation(CONFIG)
+            start = 0
+            while start < len(events):
+                end = start + rng.randint(1, 10)
+                for event in events[start:end]:
+                    sim.submit(event)
+                # Everything later is after the last timestamp so far.
+                later = [event.timestamp for event in events[end:]]
+                if later:
+                    sim.advance_to(min(later) - 1)
+                start = end
+            sim.advance_to(events[-1].timestamp + 10000)
+            with self.subTest(seed=seed):
+                self.assertEqual(sim.current_stats(),
+                                 GroceryStoreSimulation(CONFIG).run(events))
+
+    def test_submit_at_performed_time_is_rejected(self):
+        config = {'cashier_count': 2, 'express_count': 0,
+                  'self_serve_count': 0, 'line_capacity': 1}
+        sim = GroceryStoreSimulation(config)
+        sim.submit(NewArrive(0, 'A', 3))
+        sim.submit(NewArrive(0, 'C', 30))
+        sim.advance_to(10)
+        with self.assertRaises(ValueError):
+            sim.submit(NewArrive(10, 'B', 3))
+        sim.submit(NewArrive(11, 'B', 3))
+
+    def test_submit_at_time_zero(self):
+        sim = GroceryStoreSimulation('config.json')
+        sim.submit(NewArrive(0, 'Jack', 3))
+        sim.advance_to(0)
+        self.assertEqual(sim.current_stats()['total_time'], 0)
+
+    def test_no_live_events_after_run(self):
+        config = {'cashier_count': 1, 'express_count': 0,
+                  'self_serve_count': 0, 'line_capacity': 3}
+        events = [NewArrive(0, 'Jack', 3), NewArrive(40, 'Jill', 2)]
+        for engine in ['event', 'compact', 'fast']:
+            with self.subTest(engine=engine):
+                sim = GroceryStoreSimulation(dict(config, engine=engine))
+                sim.run(events)
+                with self.assertRaises(ValueError):
+                    sim.submit(NewArrive(1, 'Fred', 1))
+                with self.assertRaises(ValueError):
+                    sim.advance_to(100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# Tests of the multi-store driver in multistore.py.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from multistore import load_manifest, run_chain
+
+
+class TestMultistore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_manifest(self, entries):
+        filename = os.path.join(self.directory, 'chain.json')
+        with open(filename, 'w') as file:
+            json.dump(entries, file)
+        return filename
+
+    def test_given_name_clashing_with_default_is_rejected(self):
+        # The second store's default name is '1'.
+        filename = self.write_manifest([
+            {'name': '1', 'config': 'config.json', 'events': 'a.txt'},
+            {'config': 'config.json', 'events': 'b.txt'}])
+        with self.assertRaises(ValueError):
+            load_manifest(filename)
+
+    def test_same_name_is_rejected(self):
+        stores = [{'name': 'a', 'config': 'config.json',
+                   'events': 'events.txt'}] * 2
+        with self.assertRaises(ValueError):
+            run_chain(stores, processes=1)
+
+    def test_default_names(self):
+        filename = self.write_manifest([
+            {'config': 'config.json', 'events': 'a.txt'},
+            {'name': 'b', 'config': 'config.json', 'events': 'b.txt'},
+            {'config': 'config.json', 'events': 'c.txt'}])
+        self.assertEqual([store['name'] for store in load_manifest(filename)],
+                         ['0', 'b', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# Tests that the event queues remove items of equal priority in the order
+# they were added.
+
+import unittest
+
+from container import PriorityQueue, CalendarQueue
+from event import NewArrive
+from simulation import GroceryStoreSimulation
+
+CONFIG = {'cashier_count': 2, 'express_count': 0, 'self_serve_count': 0,
+          'line_capacity': 5}
+
+
+class TestFifoTies(unittest.TestCase):
+    def test_ties_come_out_in_insertion_order(self):
+        for container in [PriorityQueue(), CalendarQueue()]:
+            events = [NewArrive(timestamp, str(i), 1)
+                      for i, timestamp in enumerate([3, 0, 3, 3, 1, 3, 0])]
+            for event in events:
+                container.add(event)
+            removed = []
+            while not container.is_empty():
+                removed.append(container.remove())
+            with self.subTest(container=type(container).__name__):
+                self.assertEqual([event.name for event in removed],
+                                 ['1', '6', '4', '0', '2', '3', '5'])
+
+    def test_simultaneous_arrivals_join_in_file_order(self):
+        # The original sorted list put a tied item just after the first
+        # equal one, so C (added third) came out before B, joined line 1,
+        # and the stats were {'num_customers': 3, 'total_time': 25,
+        # 'max_wait': 25}.
+        events = [NewArrive(0, 'A', 1), NewArrive(0, 'B', 10),
+                  NewArrive(0, 'C', 1)]
+        for event_queue in ['priority', 'calendar']:
+            with self.subTest(event_queue=event_queue):
+                self.assertEqual(
+                    GroceryStoreSimulation(
+                        dict(CONFIG, event_queue=event_queue)).run(events),
+                    {'num_customers': 3, 'total_time': 17, 'max_wait': 17})
+
+
+if __name__ == '__main__':
+    unittest.main()
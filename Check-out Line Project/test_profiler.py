@@ -0,0 +1,66 @@
+# Tests of the opt-in profiling of simulation runs.
+
+import unittest
+
+from container import PriorityQueue, CalendarQueue
+from profiler import TimedContainer
+from event import NewArrive, CloseLine
+from simulation import GroceryStoreSimulation
+from testing_util import MODES, random_workload
+
+
+class TestProfiler(unittest.TestCase):
+    def test_profiling_leaves_stats_unchanged(self):
+        for seed in range(10):
+            store, events = random_workload(seed)
+            for mode in MODES:
+                if 'engine' in mode:
+                    continue
+                config = dict(store, **mode)
+                expected = GroceryStoreSimulation(config).run(events)
+                stats = GroceryStoreSimulation(
+                    dict(config, profile=True)).run(events)
+                with self.subTest(seed=seed, mode=mode):
+                    del stats['profile']
+                    self.assertEqual(stats, expected)
+
+    def test_event_counts(self):
+        store, events = random_workload(1)
+        stats = GroceryStoreSimulation(dict(store, profile=True)).run(events)
+        counts = {name: timing['count']
+                  for name, timing in stats['profile']['events'].items()}
+        for kind in [NewArrive, CloseLine]:
+            self.assertEqual(counts.get(kind.__name__, 0), len(
+                [event for event in events if isinstance(event, kind)]))
+        self.assertEqual(counts['Begin'], stats['num_customers'])
+        self.assertEqual(counts['Finish'], stats['num_customers'])
+        for timing in stats['profile']['events'].values():
+            self.assertGreaterEqual(timing['total_seconds'],
+                                    timing['max_seconds'])
+        queue = stats['profile']['queue']
+        self.assertEqual(queue['adds'], queue['removes'])
+        self.assertGreater(queue['high_water'], 0)
+        self.assertEqual(stats['profile']['customers']['in_store'], 0)
+
+    def test_batches_are_timed_as_one_event(self):
+        store, events = random_workload(2)
+        stats = GroceryStoreSimulation(
+            dict(store, profile=True, batch=True)).run(events)
+        self.assertEqual(list(stats['profile']['events']), ['Batch'])
+
+    def test_timed_container_keeps_order(self):
+        for container in [PriorityQueue(), CalendarQueue(key=int)]:
+            timed = TimedContainer(container)
+            for item in [5, 1, 4, 1, 3]:
+                timed.add(item)
+            removed = [timed.remove() for _ in range(3)]
+            removed.extend(timed.remove_batch())
+            self.assertEqual(removed, [1, 1, 3, 4])
+            self.assertEqual(timed.summary()['adds'], 5)
+            self.assertEqual(timed.summary()['removes'], 4)
+            self.assertEqual(timed.high_water, 5)
+            self.assertEqual(timed.size, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# Tests of the queue-length sampler against a direct computation of each
+# interval's statistics.
+
+import random
+import unittest
+
+from event import CloseLine
+from sampler import QueueSampler
+from simulation import GroceryStoreSimulation
+from store import LineList
+from workload import generate_events
+
+
+def expected_series(changes, line_count, end, interval):
+    """Return the min, max, mean and closed state of each line over each
+    interval of <interval> seconds ending by <end>, computed directly from
+    <changes>, a list of (timestamp, line, length, closed) in timestamp
+    order. Every line starts empty and open at time 0.
+    """
+    series = {'start': list(range(0, end - interval + 1, interval)),
+              'lines': [{'min': [], 'max': [], 'mean': [], 'closed': []}
+                        for _ in range(line_count)]}
+    for i in range(line_count):
+        mine = [(t, length, closed) for t, line, length, closed in changes
+                if line == i]
+        length, closed = 0, False
+        k = 0
+        for start in series['start']:
+            low = high = length
+            area = 0
+            since = start
+            while k < len(mine) and mine[k][0] < start + interval:
+                t, new_length, new_closed = mine[k]
+                area += length * (t - since)
+                since = t
+                length, closed = new_length, new_closed
+                low, high = min(low, length), max(high, length)
+                k += 1
+            area += length * (start + interval - since)
+            result = series['lines'][i]
+            result['min'].append(low)
+            result['max'].append(high)
+            result['mean'].append(area / interval)
+            result['closed'].append(closed)
+    return series
+
+
+def last(series, count):
+    """Return <series> with only its last <count> intervals."""
+    return {'start': series['start'][-count:],
+            'lines': [{key: values[-count:] for key, values in line.items()}
+                      for line in series['lines']]}
+
+
+class TestQueueSampler(unittest.TestCase):
+    def run_changes(self, seed, capacity, gap):
+        # Records random changes to 3 lines, with gaps of up to <gap>
+        # seconds between them, and returns the changes, the sampler and
+        # the time it was advanced to.
+        rng = random.Random(seed)
+        check_out_lines = LineList(3, 0, 0, 100)
+        sampler = QueueSampler(interval=10, capacity=capacity, levels=2,
+                               factor=4)
+        sampler.attach(check_out_lines)
+        changes = []
+        timestamp = 0
+        for _ in range(200):
+            timestamp += rng.choice([0, 0, rng.randint(1, gap)])
+            which_line = rng.randrange(3)
+            line = check_out_lines.lines[which_line]
+            if line.customers and rng.random() < 0.5:
+                line.customers.popleft()
+            else:
+                line.customers.append(0)
+            if rng.random() < 0.05:
+                line.closed = not line.closed
+            sampler.record(timestamp, which_line)
+            changes.append((timestamp, which_line, len(line.customers),
+                            line.closed))
+        end = timestamp + rng.randint(0, 50)
+        sampler.advance(end)
+        return changes, sampler, end
+
+    def test_series_matches_direct_computation(self):
+        for seed in range(20):
+            changes, sampler, end = self.run_changes(seed, 10 ** 4, 15)
+            for level, interval in [(0, 10), (1, 40)]:
+                with self.subTest(seed=seed, level=level):
+                    expected = expected_series(changes, 3, end, interval)
+                    series = sampler.series(level)
+                    self.assertEqual(series['interval'], interval)
+                    self.assertEqual(series['start'], expected['start'])
+                    self.assertEqual(series['lines'], expected['lines'])
+
+    def test_ring_keeps_the_latest_intervals(self):
+        # Long gaps make the ring wrap around many times, and skip whole
+        # rings of quiet intervals.
+        for seed in range(20):
+            for capacity in [1, 3, 8]:
+                changes, sampler, end = self.run_changes(seed, capacity,
+                                                         500)
+                for level, interval in [(0, 10), (1, 40)]:
+                    with self.subTest(seed=seed, capacity=capacity,
+                                      level=level):
+                        expected = last(
+                            expected_series(changes, 3, end, interval),
+                            capacity)
+                        series = sampler.series(level)
+                        self.assertEqual(series['start'], expected['start'])
+                        self.assertEqual(series['lines'], expected['lines'])
+
+    def test_simulation_fills_sampler(self):
+        config = {'cashier_count': 2, 'express_count': 0,
+                  'self_serve_count': 1, 'line_capacity': 5}
+        events = list(generate_events(200, seed=3, rate=0.5))
+        events.append(CloseLine(events[-1].timestamp, 1))
+        sampler = QueueSampler(interval=20)
+        stats = GroceryStoreSimulation(config).run(events, sampler=sampler)
+        series = sampler.series()
+        self.assertEqual(len(series['start']), stats['total_time'] // 20)
+        # Only line 1 ends closed.
+        for i, line in enumerate(series['lines']):
+            self.assertGreater(max(line['max']), 0)
+            for low, mean, high in zip(line['min'], line['mean'],
+                                       line['max']):
+                self.assertTrue(low <= mean <= high)
+            self.assertEqual(line['closed'][-1], i == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# Tests that the live-ingest server keeps simulating after a bad chunk.
+
+import asyncio
+import unittest
+
+from server import SimulationServer
+
+
+async def feed(server, chunks):
+    """Start <server>, send each of <chunks> of data on its own connection,
+    and wait until each has been simulated before sending the next.
+    """
+    ingest, stats = await server.start('127.0.0.1:0', '127.0.0.1:0')
+    for chunk in chunks:
+        reader, writer = await asyncio.open_connection(
+            *ingest.sockets[0].getsockname())
+        writer.write(chunk)
+        writer.write_eof()
+        # The server closes the connection once it has read it all.
+        await reader.read()
+        writer.close()
+        await server.drain()
+    ingest.close()
+    stats.close()
+
+
+class TestSimulationServer(unittest.TestCase):
+    def test_failed_chunk_is_logged_and_skipped(self):
+        # Jack arriving again while still in the store fails the first
+        # chunk; Jill was already submitted, and is performed with the next.
+        server = SimulationServer('config.json')
+        chunks = [b'0 Arrive Jack 3\n1 Arrive Jack 2\n5 Arrive Jill 1\n',
+                  b'20 Arrive Fred 2\n', b'40 Arrive Ann 1\n']
+        with self.assertLogs('server', 'ERROR'):
+            asyncio.run(feed(server, chunks))
+        self.assertEqual(server.received, 5)
+        self.assertEqual(server.stats()['num_customers'], 3)
+
+    def test_close_of_missing_line_is_bad(self):
+        server = SimulationServer('config.json')
+        asyncio.run(feed(server, [b'0 Close 3\n1 Close -1\n2 Close 2\n']))
+        self.assertEqual(server.received, 1)
+        self.assertEqual(server.bad_lines, 2)
+
+    def test_overlong_line_is_bad(self):
+        # The line is longer than any one read, so it is dropped before
+        # its end arrives.
+        server = SimulationServer('config.json')
+        asyncio.run(feed(server, [b'0 Arrive Jack 3\n' + b'x' * 200000 +
+                                  b'\n5 Arrive Jill 1\n']))
+        self.assertEqual(server.received, 2)
+        self.assertEqual(server.bad_lines, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# Tests of the simulation benchmark suite in simulation_benchmark.py.
+
+import unittest
+
+from simulation_benchmark import make_cases, run_case, run_benchmarks, \
+    find_regressions
+
+
+class TestSimulationBenchmark(unittest.TestCase):
+    def test_cases_have_the_requested_lines(self):
+        cases = make_cases([100, 1000], [1, 3, 30], [2, 10])
+        self.assertEqual(len(cases), 12)
+        self.assertEqual(len({case['name'] for case in cases}), 12)
+        for case in cases:
+            config = case['config']
+            lines = (config['cashier_count'] + config['express_count'] +
+                     config['self_serve_count'])
+            self.assertIn('lines={} '.format(lines), case['name'])
+            self.assertGreater(config['cashier_count'], 0)
+
+    def test_run_case_counts_every_event(self):
+        # With 5 lines, 1000 arrivals span about 2857 seconds, and a line
+        # closes every 1000 seconds. A one-line store never closes its line.
+        cases = make_cases([1000], [1, 5], [3])
+        for case, events in zip(cases, [1000, 1002]):
+            with self.subTest(case=case['name']):
+                result = run_case(case)
+                self.assertEqual(result['events'], events)
+                self.assertGreater(result['seconds'], 0)
+                self.assertAlmostEqual(result['events_per_sec'],
+                                       events / result['seconds'])
+
+    def test_run_benchmarks_names_results_by_case(self):
+        cases = make_cases([50], [3], [10])
+        results = run_benchmarks(cases)
+        self.assertEqual(list(results), [cases[0]['name']])
+        self.assertEqual(results[cases[0]['name']]['events'], 50)
+
+    def test_find_regressions(self):
+        results = {'a': {'events_per_sec': 70.0},
+                   'b': {'events_per_sec': 150.0},
+                   'c': {'events_per_sec': 1.0}}
+        baseline = {'a': {'events_per_sec': 100.0},
+                    'b': {'events_per_sec': 100.0}}
+        self.assertEqual(len(find_regressions(results, baseline, 0.2)), 1)
+        self.assertEqual(find_regressions(results, baseline, 0.3), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# Tests that resuming a simulation from a snapshot gives the same stats as
+# running it without interruption.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from simulation import GroceryStoreSimulation
+from testing_util import MODES
+from workload import generate_events, write_event_file
+
+# Event files are read without the event file cache, so that the tests
+# leave nothing behind.
+CONFIG = {'cashier_count': 2, 'express_count': 1, 'self_serve_count': 1,
+          'line_capacity': 3, 'event_cache': False}
+# The compact engine does not save snapshots.
+SNAPSHOT_MODES = [mode for mode in MODES if 'engine' not in mode]
+SETTINGS = dict(count=400, seed=7, arrival='bursty', rate=0.5,
+                closes=[(100, 0), (250, 2)])
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.directory, 'snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_resume(self, config, event_file, expected):
+        # Runs <event_file> with snapshots at several spacings, and checks
+        # that resuming the last snapshot of each run gives <expected>.
+        for setting, interval in [('snapshot_interval_events', 25),
+                                  ('snapshot_interval_events', 333),
+                                  ('snapshot_interval_time', 50),
+                                  ('snapshot_interval_time', 900)]:
+            with self.subTest(config=config, setting=setting,
+                              interval=interval):
+                stats = GroceryStoreSimulation(dict(
+                    config, snapshot_file=self.snapshot,
+                    **{setting: interval})).run(event_file)
+                self.assertEqual(stats, expected)
+                resume_with = event_file if isinstance(event_file, list) \
+                    and config.get('streaming') else None
+                for _ in range(2):
+                    # One snapshot can be resumed more than once.
+                    sim = GroceryStoreSimulation.load_snapshot(self.snapshot)
+                    self.assertEqual(sim.resume(resume_with), expected)
+                os.remove(self.snapshot)
+
+    def test_resume_from_event_list(self):
+        events = list(generate_events(**SETTINGS))
+        for mode in SNAPSHOT_MODES:
+            config = dict(CONFIG, **mode)
+            self.check_resume(config, events,
+                              GroceryStoreSimulation(config).run(events))
+
+    def test_resume_from_event_file(self):
+        filename = os.path.join(self.directory, 'events.txt')
+        write_event_file(filename, **SETTINGS)
+        for mode in SNAPSHOT_MODES:
+            config = dict(CONFIG, **mode)
+            self.check_resume(config, filename,
+                              GroceryStoreSimulation(config).run(filename))
+
+    def test_not_a_snapshot(self):
+        with open(self.snapshot, 'wb') as file:
+            file.write(b'0 Arrive Jack 3\n')
+        with self.assertRaises(ValueError):
+            GroceryStoreSimulation.load_snapshot(self.snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
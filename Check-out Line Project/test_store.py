@@ -0,0 +1,74 @@
+# Tests of customers who arrive again while still in the grocery store.
+
+import unittest
+
+from event import NewArrive, CloseLine
+from simulation import GroceryStoreSimulation
+from store import GroceryStore, CustomerTable, CustomerColumns
+from testing_util import MODES
+
+CONFIG = {'cashier_count': 2, 'express_count': 0, 'self_serve_count': 0,
+          'line_capacity': 10}
+
+
+class TestRepeatArrival(unittest.TestCase):
+    def test_arrival_while_in_line_is_rejected(self):
+        events = [NewArrive(0, 'Jack', 3), NewArrive(0, 'Jill', 3),
+                  NewArrive(0, 'Jim', 3), NewArrive(1, 'Jim', 2)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                with self.assertRaises(ValueError):
+                    GroceryStoreSimulation(dict(CONFIG, **mode)).run(events)
+
+    def test_arrival_after_leaving_is_a_new_visit(self):
+        events = [NewArrive(0, 'Jack', 3), NewArrive(40, 'Jack', 2)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                stats = GroceryStoreSimulation(dict(CONFIG, **mode)).run(
+                    events)
+                self.assertEqual(stats['num_customers'], 2)
+                self.assertEqual(stats['total_time'], 49)
+
+    def test_arrival_while_displaced_is_rejected(self):
+        # Jim is displaced when line 0 closes, and is still in the store
+        # waiting to rejoin.
+        events = [NewArrive(0, 'Jack', 3), NewArrive(0, 'Jill', 3),
+                  NewArrive(0, 'Jim', 3), CloseLine(1, 0),
+                  NewArrive(1, 'Jim', 3)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                with self.assertRaises(ValueError):
+                    GroceryStoreSimulation(dict(CONFIG, **mode)).run(events)
+
+    def test_rejected_arrival_joins_no_line(self):
+        store = GroceryStore(CONFIG)
+        for name in ['Jack', 'Jill', 'Jim']:
+            store.new_join(0, name, 3)
+        with self.assertRaises(ValueError):
+            store.new_join(1, 'Jack', 2)
+        # As with new_join, the arrivals before Jim's still join.
+        with self.assertRaises(ValueError):
+            store.new_join_batch(1, [('Ann', 1), ('Jim', 2)])
+        self.assertEqual([list(line.customers)
+                          for line in store.check_out_lines.lines],
+                         [[0, 2], [1, 3]])
+
+
+class TestCustomerTables(unittest.TestCase):
+    def test_tables_are_not_lists(self):
+        for table in [CustomerTable(), CustomerColumns()]:
+            with self.subTest(table=type(table).__name__):
+                self.assertNotIsInstance(table, list)
+                jack = table.new(table.id_of('Jack'), 'Jack', 3, 0)
+                table.id_of('Jill')
+                self.assertEqual(len(table), 2)
+                self.assertEqual(table[0].name, jack.name)
+                self.assertIsNone(table[1])
+                table.remove(0)
+                self.assertIsNone(table[0])
+                self.assertEqual(len(table), 2)
+                self.assertEqual(table.id_of('Jack'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# Tests of the per-customer traces written by tracing.py.
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from event import NewArrive
+from simulation import GroceryStoreSimulation
+from tracing import CsvTrace
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_full_store_rows_have_real_line_numbers(self):
+        config = {'cashier_count': 2, 'express_count': 0,
+                  'self_serve_count': 0, 'line_capacity': 1}
+        # Only Jack and Jill fit; Jim and Joe join the last line anyway.
+        events = [NewArrive(0, name, 3)
+                  for name in ['Jack', 'Jill', 'Jim', 'Joe']]
+        filename = os.path.join(self.directory, 'trace.csv')
+        with CsvTrace(filename, chunk_size=3) as trace:
+            GroceryStoreSimulation(config).run(events, trace)
+        with open(filename, newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([(row['name'], row['line']) for row in rows],
+                         [('Jack', '0'), ('Jill', '1'), ('Jim', '1'),
+                          ('Joe', '1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# Workloads and engine modes shared by the tests that compare one way of
+# running a simulation against another.
+
+import random
+
+from workload import generate_events
+
+# The settings each mode adds to the store configuration. The compact
+# engine modes cannot be combined with the profile or snapshot_file
+# settings.
+MODES = [{}, {'event_queue': 'calendar'}, {'batch': True},
+         {'streaming': True}, {'wait_quantiles': True},
+         {'customer_table': True}, {'engine': 'compact'},
+         {'engine': 'compact', 'streaming': True}]
+
+
+def random_workload(seed, closes=True):
+    """Return a random store configuration and a list of events with many
+    timestamp ties, and some line closures if <closes>.
+
+    @type seed: int
+    @type closes: bool
+    @rtype: (dict[str, int], list[Event])
+    """
+    rng = random.Random(seed)
+    config = {'cashier_count': rng.randint(1, 3),
+              'express_count': rng.randint(0, 2),
+              'self_serve_count': rng.randint(0, 2),
+              'line_capacity': rng.randint(1, 6)}
+    line_count = (config['cashier_count'] + config['express_count'] +
+                  config['self_serve_count'])
+    count = rng.randint(20, 200)
+    if closes:
+        closes = sorted((rng.randint(0, count), line)
+                        for line in rng.sample(range(line_count),
+                                               rng.randint(0, line_count - 1)))
+    else:
+        closes = []
+    events = list(generate_events(count, seed=seed,
+                                  arrival=rng.choice(['poisson', 'bursty']),
+                                  rate=rng.choice([0.25, 0.5, 1.0, 2.0]),
+                                  max_items=rng.randint(1, 20),
+                                  closes=closes))
+    return config, events
@@ -0,0 +1,340 @@
+"""Per-customer traces of grocery store simulations.
+
+A trace has one row per customer who finishes checking out, in the order
+they finish, with their name, arrival time, line number, and the times they
+began and finished checking out and how long they waited in all.
+
+Pass a trace sink to GroceryStoreSimulation.run to write one, e.g.
+
+    with open_trace('trace.npz') as trace:
+        GroceryStoreSimulation('config.json').run('events.txt', trace)
+
+Rows are kept in one array per column until a chunk is full, and then
+written out together, so the trace is never all in memory at once. A
+CsvTrace writes a CSV file with a header row. A NpzTrace writes a NumPy
+.npz archive with one array per column, which numpy.load reads back; the
+columns are written to temporary files as the simulation runs and gathered
+into the archive when it is closed, so NumPy is not needed to write it.
+"""
+import csv
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+from array import array
+from itertools import islice
+from operator import sub
+
+# The number of rows to keep before writing them out.
+_CHUNK_SIZE = 65536
+# The columns of a trace, after the name.
+_COLUMNS = ('arrival', 'line', 'begin', 'finish', 'wait')
+# The number of values buffered per row: the name and every column but the
+# wait.
+_ROW_WIDTH = len(_COLUMNS)
+# The first bytes of a .npy file: the magic string and format version 1.0.
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+def open_trace(filename, chunk_size=_CHUNK_SIZE):
+    """Return a trace sink writing to <filename>: a NpzTrace if it ends
+    with '.npz', and a CsvTrace otherwise.
+
+    @type filename: str
+    @type chunk_size: int
+    @rtype: TraceSink
+    """
+    if filename.endswith('.npz'):
+        return NpzTrace(filename, chunk_size)
+    return CsvTrace(filename, chunk_size)
+
+
+class TraceSink:
+    """A destination for the rows of a trace, written in chunks.
+
+    This class is abstract; subclasses must implement _write_chunk.
+
+    === Public attributes ===
+    @type rows: int
+        The number of rows recorded so far.
+    """
+    # === Private Attributes ===
+    # @type _chunk_size: int
+    #     How many rows to keep before writing them.
+    # @type _buffer: list[str | int]
+    #     The rows not yet written, one after another: the name, arrival,
+    #     line, begin and finish of each. Waits are worked out when the
+    #     rows are written.
+
+    def __init__(self, chunk_size=_CHUNK_SIZE):
+        """Initialize a TraceSink with no rows.
+
+        @type self: TraceSink
+        @type chunk_size: int
+        @rtype: None
+        """
+        self.rows = 0
+        self._chunk_size = chunk_size
+        self._buffer = []
+
+    def record(self, customer, line):
+        """Record the row of <customer>, who has just finished checking out
+        of <line>.
+
+        @type self: TraceSink
+        @type customer: Customer
+        @type line: Line
+        @rtype: None
+        """
+        finish = customer.end_waiting
+        buffer = self._buffer
+        # Finish events come a check out time after Begin events.
+        buffer.extend((customer.name, customer.start_waiting,
+                       customer.which_line,
+                       finish - line.get_check_out_time(customer), finish))
+        if len(buffer) >= _ROW_WIDTH * self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write out the rows recorded since the last chunk was written.
+
+        @type self: TraceSink
+        @rtype: None
+        """
+        buffer = self._buffer
+        if len(buffer) > 0:
+            names = buffer[0::_ROW_WIDTH]
+            columns = [array('q', buffer[i::_ROW_WIDTH])
+                       for i in range(1, _ROW_WIDTH)]
+            columns.append(array('q', map(sub, columns[3], columns[0])))
+            self._write_chunk(names, columns)
+            self.rows += len(names)
+            self._buffer = []
+
+    def close(self):
+        """Write out any remaining rows and finish the trace.
+
+        @type self: TraceSink
+        @rtype: None
+        """
+        self.flush()
+
+    def _write_chunk(self, names, columns):
+        """Write the rows with <names> and the other <columns>.
+
+        @type self: TraceSink
+        @type names: list[str]
+        @type columns: list[array]
+        @rtype: None
+        """
+        raise NotImplementedError('Implemented in a subclass')
+
+    def __enter__(self):
+        """Return this trace sink, for use in a with statement.
+
+        @type self: TraceSink
+        @rtype: TraceSink
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close this trace sink at the end of a with statement.
+
+        @type self: TraceSink
+        @rtype: None
+        """
+        self.close()
+
+
+class CsvTrace(TraceSink):
+    """A trace written to a CSV file, with a header row.
+
+    >>> import os, tempfile
+    >>> from simulation import GroceryStoreSimulation
+    >>> handle, filename = tempfile.mkstemp(suffix='.csv')
+    >>> os.close(handle)
+    >>> config = {'cashier_count': 1, 'express_count': 1,
+    ...           'self_serve_count': 1, 'line_capacity': 10,
+    ...           'event_cache': False}
+    >>> with CsvTrace(filename, chunk_size=2) as trace:
+    ...     stats = GroceryStoreSimulation(config).run('events.txt', trace)
+    >>> with open(filename) as file:
+    ...     rows = file.read().splitlines()
+    >>> len(rows) == stats['num_customers'] + 1
+    True
+    >>> rows[:2]
+    ['name,arrival,line,begin,finish,wait', 'James,0,0,0,14,14']
+    >>> os.remove(filename)
+    """
+    # === Private Attributes ===
+    # @type _file: file
+    #     The open CSV file.
+    # @type _writer: csv.writer
+    #     Writes rows to _file.
+
+    def __init__(self, filename, chunk_size=_CHUNK_SIZE):
+        """Initialize a CsvTrace writing to <filename>.
+
+        @type self: CsvTrace
+        @type filename: str
+        @type chunk_size: int
+        @rtype: None
+        """
+        super(CsvTrace, self).__init__(chunk_size)
+        self._file = open(filename, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(('name',) + _COLUMNS)
+
+    def _write_chunk(self, names, columns):
+        """Overrides the _write_chunk method in super.
+
+        @type self: CsvTrace
+        @type names: list[str]
+        @type columns: list[array]
+        @rtype: None
+        """
+        self._writer.writerows(zip(names, *columns))
+
+    def close(self):
+        """Overrides the close method in super.
+
+        @type self: CsvTrace
+        @rtype: None
+        """
+        super(CsvTrace, self).close()
+        self._file.close()
+
+
+class NpzTrace(TraceSink):
+    """A trace written to a NumPy .npz archive.
+
+    The archive holds one array per column: 'name' as fixed-width Unicode
+    strings, and the rest as 64-bit integers.
+
+    >>> import os, tempfile, zipfile
+    >>> handle, filename = tempfile.mkstemp(suffix='.npz')
+    >>> os.close(handle)
+    >>> from store import Customer, CashierLine
+    >>> jack = Customer('Jack', 3)
+    >>> jack.start_waiting, jack.which_line, jack.end_waiting = 2, 0, 20
+    >>> with NpzTrace(filename) as trace:
+    ...     trace.record(jack, CashierLine(10, False))
+    >>> sorted(zipfile.ZipFile(filename).namelist())
+    ... # doctest: +NORMALIZE_WHITESPACE
+    ['arrival.npy', 'begin.npy', 'finish.npy', 'line.npy', 'name.npy',
+     'wait.npy']
+    >>> begin = zipfile.ZipFile(filename).read('begin.npy')
+    >>> int.from_bytes(begin[-8:], 'little')
+    10
+    >>> os.remove(filename)
+    """
+    # === Private Attributes ===
+    # @type _filename: str
+    #     The archive to write when closed.
+    # @type _name_file: file
+    #     A temporary file with the names written so far, one per line.
+    # @type _name_width: int
+    #     The length of the longest name written so far.
+    # @type _column_files: list[file]
+    #     A temporary file per column of _COLUMNS, with the values written
+    #     so far as little-endian 64-bit integers.
+
+    def __init__(self, filename, chunk_size=_CHUNK_SIZE):
+        """Initialize a NpzTrace writing to <filename> when closed.
+
+        @type self: NpzTrace
+        @type filename: str
+        @type chunk_size: int
+        @rtype: None
+        """
+        super(NpzTrace, self).__init__(chunk_size)
+        self._filename = filename
+        self._name_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._name_width = 1
+        self._column_files = [tempfile.TemporaryFile() for _ in _COLUMNS]
+
+    def _write_chunk(self, names, columns):
+        """Overrides the _write_chunk method in super.
+
+        @type self: NpzTrace
+        @type names: list[str]
+        @type columns: list[array]
+        @rtype: None
+        """
+        # Names never contain whitespace, since event files are split on
+        # it, so one per line is safe.
+        self._name_file.write('\n'.join(names))
+        self._name_file.write('\n')
+        self._name_width = max(self._name_width, max(map(len, names)))
+        for column, file in zip(columns, self._column_files):
+            if sys.byteorder == 'big':
+                column.byteswap()
+            column.tofile(file)
+
+    def close(self):
+        """Overrides the close method in super. Writes the archive.
+
+        @type self: NpzTrace
+        @rtype: None
+        """
+        super(NpzTrace, self).close()
+        with zipfile.ZipFile(self._filename, 'w', allowZip64=True) as archive:
+            with archive.open('name.npy', 'w', force_zip64=True) as member:
+                self._write_names(member)
+            for column, file in zip(_COLUMNS, self._column_files):
+                with archive.open(column + '.npy', 'w',
+                                  force_zip64=True) as member:
+                    member.write(_npy_header('<i8', self.rows))
+                    file.seek(0)
+                    shutil.copyfileobj(file, member)
+                file.close()
+        self._name_file.close()
+
+    def _write_names(self, member):
+        """Write the names written so far to <member> as a .npy file.
+
+        @type self: NpzTrace
+        @type member: file
+        @rtype: None
+        """
+        width = self._name_width
+        member.write(_npy_header('<U{}'.format(width), self.rows))
+        self._name_file.seek(0)
+        while True:
+            chunk = list(islice(self._name_file, self._chunk_size))
+            if len(chunk) == 0:
+                break
+            # Each name is <width> UTF-32 code units, padded with zeros.
+            member.write(''.join([line[:-1].ljust(width, '\x00')
+                                  for line in chunk]).encode('utf-32-le'))
+
+
+def _npy_header(descr, length):
+    """Return the header of a .npy file holding a one dimensional array of
+    <length> values of NumPy type <descr>.
+
+    @type descr: str
+    @type length: int
+    @rtype: bytes
+
+    >>> header = _npy_header('<i8', 3)
+    >>> len(header) % 64
+    0
+    >>> header[10:].rstrip()
+    b"{'descr': '<i8', 'fortran_order': False, 'shape': (3,), }"
+    """
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}" \
+        .format(descr, length)
+    # The data must start on a multiple of 64 bytes; the header is padded
+    # with spaces and ends in a newline.
+    used = len(_NPY_MAGIC) + 2 + len(header) + 1
+    header += ' ' * (-used % 64) + '\n'
+    return _NPY_MAGIC + struct.pack('<H', len(header)) + \
+        header.encode('latin1')
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,211 @@
+"""Synthetic workloads for the grocery store simulation.
+
+This file generates arrival events, plus optional scheduled line closures,
+in the same format as the event files read by create_event_list. The same
+seed and settings always give the same events, so generated files can be
+used as repeatable benchmarks.
+
+Usage:
+    python workload.py events_big.txt --count 10000000 --seed 1 \
+        --arrival bursty --rate 0.3 --close 5000:0 --close 9000:1
+"""
+import argparse
+import random
+
+from event import NewArrive, CloseLine
+
+# How many lines write_event_file buffers before writing them out.
+_CHUNK_SIZE = 65536
+
+
+def generate_records(count, seed=0, arrival='poisson', rate=0.25,
+                     burst_size=5, items='uniform', min_items=1,
+                     max_items=20, mean_items=5, closes=()):
+    """Yield the records of a synthetic workload, in timestamp order.
+
+    Each record is a (timestamp, name, items) triple for an arrival, or a
+    (timestamp, None, line) triple for a line closing. Customers are named
+    'c0', 'c1', ... in order of arrival.
+
+    @type count: int
+        The number of arrivals to generate.
+    @type seed: int
+    @type arrival: str
+        'poisson' for arrivals at exponentially distributed intervals, or
+        'bursty' for groups of customers who all arrive at the same time,
+        with the groups themselves arriving as a Poisson process.
+    @type rate: float
+        The average number of arrivals per second.
+    @type burst_size: float
+        For 'bursty' arrivals, the average number of customers in a group.
+    @type items: str
+        'uniform' for item counts spread evenly over [min_items, max_items],
+        or 'geometric' for counts starting at min_items with a long tail,
+        averaging about mean_items and capped at max_items.
+    @type min_items: int
+    @type max_items: int
+    @type mean_items: float
+    @type closes: iterable[(int, int)]
+        (timestamp, line) pairs at which to close a line. Each close comes
+        before any arrival at the same timestamp.
+    @rtype: iterator[(int, str | None, int)]
+
+    >>> records = list(generate_records(4, seed=1, closes=[(5, 0)]))
+    >>> len(records)
+    5
+    >>> [name for _, name, _ in records]
+    ['c0', 'c1', None, 'c2', 'c3']
+    >>> records == list(generate_records(4, seed=1, closes=[(5, 0)]))
+    True
+    >>> list(generate_records(4, rate=0))
+    Traceback (most recent call last):
+    ...
+    ValueError: rate must be positive, not 0
+    """
+    if arrival not in ('poisson', 'bursty'):
+        raise ValueError('Unknown arrival process: {}'.format(arrival))
+    if items not in ('uniform', 'geometric'):
+        raise ValueError('Unknown item distribution: {}'.format(items))
+    if rate <= 0:
+        raise ValueError('rate must be positive, not {}'.format(rate))
+    if burst_size <= 0:
+        raise ValueError('burst_size must be positive, not {}'.format(
+            burst_size))
+
+    rng = random.Random(seed)
+    expovariate = rng.expovariate
+    randint = rng.randint
+    closes = sorted(closes)
+    next_close = 0
+    # Bursts arrive burst_size times less often than single customers would.
+    group_rate = rate / burst_size if arrival == 'bursty' else rate
+    extra = max(mean_items - min_items, 0)
+    time = 0.0
+    i = 0
+    while i < count:
+        time += expovariate(group_rate)
+        timestamp = int(time)
+        while next_close < len(closes) and \
+                closes[next_close][0] <= timestamp:
+            yield closes[next_close][0], None, closes[next_close][1]
+            next_close += 1
+
+        if arrival == 'bursty' and burst_size > 1:
+            # int() of an exponential variable with mean m averages about
+            # m - 0.5, so the group sizes average about burst_size.
+            group = 1 + int(expovariate(1 / (burst_size - 0.5)))
+        else:
+            group = 1
+        for _ in range(min(group, count - i)):
+            if items == 'uniform':
+                num_items = randint(min_items, max_items)
+            else:
+                num_items = min(min_items + int(expovariate(1 / extra))
+                                if extra > 0 else min_items, max_items)
+            yield timestamp, 'c' + str(i), num_items
+            i += 1
+
+    for close in closes[next_close:]:
+        yield close[0], None, close[1]
+
+
+def generate_events(count, **settings):
+    """Yield the Events of a synthetic workload, in timestamp order.
+
+    The events are the same ones create_event_list would read from a file
+    written by write_event_file with the same arguments.
+
+    @type count: int
+    @type settings: dict[str, object]
+        Any of the keyword arguments of generate_records.
+    @rtype: iterator[Event]
+
+    >>> events = list(generate_events(3, seed=1, closes=[(5, 0)]))
+    >>> [type(event).__name__ for event in events]
+    ['NewArrive', 'NewArrive', 'CloseLine', 'NewArrive']
+    """
+    for timestamp, name, value in generate_records(count, **settings):
+        if name is None:
+            yield CloseLine(timestamp, value)
+        else:
+            yield NewArrive(timestamp, name, value)
+
+
+def write_event_file(filename, count, **settings):
+    """Write a synthetic workload to the event file <filename>.
+
+    @type filename: str
+    @type count: int
+    @type settings: dict[str, object]
+        Any of the keyword arguments of generate_records.
+    @rtype: None
+
+    >>> import os, tempfile
+    >>> from event import create_event_list
+    >>> handle, filename = tempfile.mkstemp()
+    >>> os.close(handle)
+    >>> write_event_file(filename, 100, seed=3, arrival='bursty',
+    ...                  items='geometric', closes=[(20, 1)])
+    >>> events = create_event_list(filename, cache=False)
+    >>> [vars(event) for event in events] == \\
+    ...     [vars(event) for event in generate_events(
+    ...         100, seed=3, arrival='bursty', items='geometric',
+    ...         closes=[(20, 1)])]
+    True
+    >>> os.remove(filename)
+    """
+    chunk = []
+    with open(filename, 'w') as file:
+        for timestamp, name, value in generate_records(count, **settings):
+            if name is None:
+                chunk.append('{} Close {}\n'.format(timestamp, value))
+            else:
+                chunk.append('{} Arrive {} {}\n'.format(
+                    timestamp, name, value))
+            if len(chunk) >= _CHUNK_SIZE:
+                file.write(''.join(chunk))
+                chunk = []
+        file.write(''.join(chunk))
+
+
+def _parse_close(text):
+    """Return the (timestamp, line) pair written as 'timestamp:line'.
+
+    @type text: str
+    @rtype: (int, int)
+
+    >>> _parse_close('500:2')
+    (500, 2)
+    """
+    timestamp, _, line = text.partition(':')
+    return int(timestamp), int(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Write a synthetic grocery store event file.')
+    parser.add_argument('filename', help='the event file to write')
+    parser.add_argument('--count', type=int, default=1000,
+                        help='number of arrivals')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--arrival', choices=['poisson', 'bursty'],
+                        default='poisson')
+    parser.add_argument('--rate', type=float, default=0.25,
+                        help='average arrivals per second')
+    parser.add_argument('--burst-size', type=float, default=5,
+                        help='average customers per burst')
+    parser.add_argument('--items', choices=['uniform', 'geometric'],
+                        default='uniform')
+    parser.add_argument('--min-items', type=int, default=1)
+    parser.add_argument('--max-items', type=int, default=20)
+    parser.add_argument('--mean-items', type=float, default=5)
+    parser.add_argument('--close', type=_parse_close, action='append',
+                        default=[], metavar='TIMESTAMP:LINE',
+                        help='close a line at a time; may be repeated')
+    args = parser.parse_args()
+
+    write_event_file(args.filename, args.count, seed=args.seed,
+                     arrival=args.arrival, rate=args.rate,
+                     burst_size=args.burst_size, items=args.items,
+                     min_items=args.min_items, max_items=args.max_items,
+                     mean_items=args.mean_items, closes=args.close)